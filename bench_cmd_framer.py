@@ -0,0 +1,72 @@
+import time
+import random
+import argparse
+
+from hday.cmd import CmdThread, CmdPacket, buildPacket
+
+
+def make_stream(packet_count, noise_ratio, seed=0):
+    """Sensor bypass status packets for ids 128~139 with random garbage and broken checksums mixed in."""
+    rng = random.Random(seed)
+    stream = bytearray()
+    for i in range(packet_count):
+        sensor_id = 128 + (i % 12)
+        payload = bytes([sensor_id, 0, 48]) + bytes(rng.getrandbits(8) for _ in range(48))
+        packet = buildPacket(CmdPacket.PKT_TYPE_STATUS, 0x000B, 0, payload)
+        if rng.random() < noise_ratio:
+            stream += bytes(rng.getrandbits(8) for _ in range(rng.randint(1, 16)))
+        if rng.random() < noise_ratio:
+            packet[-1] ^= 0xFF
+        stream += packet
+    return bytes(stream)
+
+
+class RecordingThread(CmdThread):
+    """CmdThread that only records the packets it would dispatch."""
+
+    def __init__(self):
+        super().__init__(None)
+        self.packets = []
+
+    def _dispatchPacket(self, packet):
+        self.packets.append((packet.type, packet.cmd, packet.err_code, packet.length,
+                             bytes(packet.data[:packet.length])))
+
+
+def chunks(stream, chunk_size):
+    return [stream[i:i + chunk_size] for i in range(0, len(stream), chunk_size)]
+
+
+def bench(feed, rx_chunks, total_bytes):
+    start = time.perf_counter()
+    for chunk in rx_chunks:
+        feed(chunk)
+    elapsed = time.perf_counter() - start
+    return total_bytes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the byte-wise packet parser with CmdFramer.')
+    parser.add_argument('--packets', type=int, default=20000, help='Number of status packets in the stream')
+    parser.add_argument('--chunk', type=int, default=512, help='Bytes per simulated port.read()')
+    parser.add_argument('--noise', type=float, default=0.05, help='Probability of garbage / bad checksum per packet')
+    args = parser.parse_args()
+
+    stream = make_stream(args.packets, args.noise)
+    rx_chunks = chunks(stream, args.chunk)
+
+    legacy = RecordingThread()
+    legacy_rate = bench(legacy.parsingPacket, rx_chunks, len(stream))
+
+    framer = RecordingThread()
+    framer_rate = bench(framer.framer.feed, rx_chunks, len(stream))
+
+    print(f"stream     : {len(stream)} bytes, {args.packets} packets, chunk {args.chunk} bytes")
+    print(f"parsing    : {legacy_rate / 1e6:8.2f} MB/s, {len(legacy.packets)} packets")
+    print(f"framer     : {framer_rate / 1e6:8.2f} MB/s, {len(framer.packets)} packets")
+    print(f"speedup    : {framer_rate / legacy_rate:8.1f}x")
+    print(f"identical  : {legacy.packets == framer.packets}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import os
+import json
+import time
+import threading
+
+import cv2
+import numpy as np
+
+
+STEREO_WIDTH = 2560
+MAX_PROBE_INDEX = 3
+SYSFS_VIDEO_PATH = "/sys/class/video4linux"
+CAMERA_CACHE_PATH = os.path.expanduser("~/.cache/state_collector_device/stereo_camera.json")
+
+
+def _read_sysfs(path):
+    try:
+        with open(path, "r") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def list_video_devices(sysfs_path=None):
+    """V4L2 캡처 장치 목록: [{"index", "name", "serial", "vendor", "product", "usb_path"}, ...]
+
+    /sys/class/video4linux/videoN의 이름과 USB 장치(상위 디렉토리)의 serial/idVendor/idProduct를 읽는다.
+    장치를 열지 않으므로 빠르다. sysfs가 없는 OS에서는 빈 리스트.
+    """
+    devices = []
+    sysfs_path = SYSFS_VIDEO_PATH if sysfs_path is None else sysfs_path
+    if not os.path.isdir(sysfs_path):
+        return devices
+    for entry in os.listdir(sysfs_path):
+        if not entry.startswith("video") or not entry[5:].isdigit():
+            continue
+        node = os.path.join(sysfs_path, entry)
+        # 같은 카메라의 metadata 노드(index 1 이상)는 제외
+        if _read_sysfs(os.path.join(node, "index")) not in (None, "0"):
+            continue
+        usb_device = os.path.realpath(os.path.join(node, "device", ".."))
+        devices.append({
+            "index": int(entry[5:]),
+            "name": _read_sysfs(os.path.join(node, "name")),
+            "serial": _read_sysfs(os.path.join(usb_device, "serial")),
+            "vendor": _read_sysfs(os.path.join(usb_device, "idVendor")),
+            "product": _read_sysfs(os.path.join(usb_device, "idProduct")),
+            "usb_path": os.path.basename(usb_device),
+        })
+    return sorted(devices, key=lambda device: device["index"])
+
+
+def _identity(device):
+    return {key: device[key] for key in ("name", "serial", "vendor", "product")}
+
+
+def _open_stereo(index):
+    cap = cv2.VideoCapture(index)
+    if cap.isOpened():
+        ret, frame = cap.read()
+        if ret and frame.shape[1] == STEREO_WIDTH:
+            return cap
+    cap.release()
+    return None
+
+
+def find_stereo_camera(cache_path=CAMERA_CACHE_PATH, sysfs_path=None):
+    """스테레오 카메라를 열어 (cap, index)를 반환, 없으면 (None, None).
+
+    한 번 찾은 카메라의 이름/serial/VID/PID를 cache_path에 저장해 두고, 다음에는
+    sysfs에서 같은 장치의 현재 index를 찾아 그것만 연다 (재연결로 번호가 바뀌어도 됨).
+    캐시가 맞지 않을 때만 index 0~2를 차례로 열어 보는 기존 방식으로 찾는다.
+    """
+    devices = list_video_devices(sysfs_path)
+    cached = None
+    if cache_path is not None and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "r") as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = None
+    if cached is not None:
+        for device in devices:
+            if _identity(device) == cached:
+                cap = _open_stereo(device["index"])
+                if cap is not None:
+                    return cap, device["index"]
+
+    for index in range(MAX_PROBE_INDEX):
+        cap = _open_stereo(index)
+        if cap is None:
+            continue
+        identity = [_identity(device) for device in devices if device["index"] == index]
+        if identity and cache_path is not None:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with open(cache_path, "w") as f:
+                json.dump(identity[0], f)
+        return cap, index
+    return None, None
+
+
+def get_stereo_camera(cache_path=CAMERA_CACHE_PATH):
+    """Find the stereo camera connected to the USB."""
+    return find_stereo_camera(cache_path)[0]
+
+
+class FrameGrabber:
+    """Grabs camera frames continuously on its own thread.
+
+    Every grab() is stamped with time.monotonic_ns() right after it returns
+    (the driver timestamp from CAP_PROP_POS_MSEC is kept too when the backend
+    reports one) and decoded into a small ring of preallocated frames. The
+    recorder calls pick() on each tick to get a copy of the frame grabbed
+    nearest to that moment, without waiting for the camera. Frames that were
+    never picked are counted in skipped_count, frames picked twice in
+    repeated_count.
+
+    With decode=False frames are only grabbed, which keeps the camera
+    streaming (and its exposure settled) without decoding every frame;
+    set_decoding(True) before picking.
+    """
+
+    def __init__(self, cap, ring_size=4, decode=True):
+        self.cap = cap
+        self.decode = decode
+        self.ring_size = ring_size
+        self.slots = [None] * ring_size
+        self.grab_ns = np.zeros(ring_size, dtype=np.int64)
+        self.driver_ms = np.zeros(ring_size, dtype=np.float64)
+        self.seq = np.full(ring_size, -1, dtype=np.int64)
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.thread = None
+        self.is_running = False
+        self.grab_count = 0
+        self.grab_base = 0
+        self.last_grab_ns = 0
+        self.fail_count = 0
+        self.fail_base = 0
+        self.last_picked = None
+        self.picked_count = 0
+        self.skipped_count = 0
+        self.repeated_count = 0
+
+    def start(self):
+        if self.is_running:
+            return self
+        self.is_running = True
+        self.thread = threading.Thread(target=self._grab_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.is_running = False
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def set_decoding(self, decode):
+        """디코딩 시작/중지. 시작할 때 이전에 디코딩된 프레임은 pick 대상에서 제외"""
+        with self.lock:
+            if decode and not self.decode:
+                self.seq[:] = -1
+            self.decode = decode
+
+    def reset_counters(self):
+        with self.lock:
+            self.grab_base = self.grab_count
+            self.fail_base = self.fail_count
+            self.last_picked = None
+            self.picked_count = 0
+            self.skipped_count = 0
+            self.repeated_count = 0
+
+    def _grab_loop(self):
+        while self.is_running:
+            if not self.cap.grab():
+                self.fail_count += 1
+                time.sleep(0.001)
+                continue
+            grab_ns = time.monotonic_ns()
+            with self.cond:
+                self.last_grab_ns = grab_ns
+                self.cond.notify_all()
+                if not self.decode:
+                    continue
+            driver_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+
+            index = self.grab_count % self.ring_size
+            with self.lock:
+                self.seq[index] = -1  # 디코딩 중인 slot은 pick 대상에서 제외
+                slot = self.slots[index]
+            # retrieve는 GIL을 놓고 디코딩하므로 lock 밖에서 수행
+            ret, frame = self.cap.retrieve(slot) if slot is not None else self.cap.retrieve()
+            if not ret:
+                self.fail_count += 1
+                continue
+            with self.cond:
+                self.slots[index] = frame
+                self.grab_ns[index] = grab_ns
+                self.driver_ms[index] = driver_ms if driver_ms > 0 else 0.0
+                self.seq[index] = self.grab_count
+                self.grab_count += 1
+                self.cond.notify_all()
+
+    def wait_first(self, timeout=None):
+        """디코딩된 프레임이 하나라도 생길 때까지 대기"""
+        with self.cond:
+            return self.cond.wait_for(lambda: (self.seq >= 0).any(), timeout)
+
+    def wait_grab(self, timeout=None):
+        """첫 grab까지 대기 (디코딩 여부와 무관)"""
+        with self.cond:
+            return self.cond.wait_for(lambda: self.last_grab_ns > 0, timeout)
+
+    def pick(self, target_ns=None):
+        """target_ns(기본: 지금)에 가장 가까운 프레임의 (frame 복사본, grab_ns, driver_ms, seq), 없으면 None"""
+        if target_ns is None:
+            target_ns = time.monotonic_ns()
+        with self.lock:
+            valid = self.seq >= 0
+            if not valid.any():
+                return None
+            distance = np.where(valid, np.abs(self.grab_ns - target_ns), np.iinfo(np.int64).max)
+            index = int(np.argmin(distance))
+            seq = int(self.seq[index])
+            frame = self.slots[index].copy()
+            grab_ns = int(self.grab_ns[index])
+            driver_ms = float(self.driver_ms[index])
+
+            if self.last_picked is None:
+                self.last_picked = seq
+            elif seq == self.last_picked:
+                self.repeated_count += 1
+            elif seq > self.last_picked:
+                self.skipped_count += seq - self.last_picked - 1
+                self.last_picked = seq
+            self.picked_count += 1
+        return frame, grab_ns, driver_ms, seq
+
+    def get_stats(self):
+        return {
+            "grabbed": self.grab_count - self.grab_base,
+            "picked": self.picked_count,
+            "skipped": self.skipped_count,
+            "repeated": self.repeated_count,
+            "grab_failures": self.fail_count - self.fail_base,
+        }
+
+
+class CameraSession:
+    """The stereo camera kept open, with its FrameGrabber running, across episodes.
+
+    Auto exposure stays settled between episodes and nothing is probed again.
+    Between episodes frames are only grabbed, not decoded.
+    ensure_open() reopens the camera (through the sysfs identity cache) when
+    it has stopped delivering frames, e.g. after a replug.
+    """
+
+    def __init__(self, cache_path=CAMERA_CACHE_PATH, stale_after=1.0):
+        self.cache_path = cache_path
+        self.stale_after = stale_after
+        self.cap = None
+        self.index = None
+        self.grabber = None
+        self.height = None
+        self.width = None
+        self.open_count = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def open(self):
+        self.cap, self.index = find_stereo_camera(self.cache_path)
+        if self.cap is None:
+            raise RuntimeError("Stereo camera not found.")
+        ret, frame = self.cap.read()
+        if not ret:
+            self.close()
+            raise RuntimeError("Failed to read a frame from the camera.")
+        self.height, self.width = frame.shape[:2]
+        self.grabber = FrameGrabber(self.cap, decode=False).start()
+        self.open_count += 1
+        return self
+
+    def is_alive(self):
+        if self.cap is None or self.grabber is None:
+            return False
+        last_ns = self.grabber.last_grab_ns
+        if last_ns == 0:
+            return self.grabber.wait_grab(self.stale_after)
+        return (time.monotonic_ns() - last_ns) / 1e9 < self.stale_after
+
+    def ensure_open(self):
+        if not self.is_alive():
+            self.close()
+            self.open()
+        return self
+
+    def close(self):
+        if self.grabber is not None:
+            self.grabber.stop()
+            self.grabber = None
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
@@ -0,0 +1,161 @@
+import os
+import time
+import sqlite3
+import argparse
+
+
+CATALOG_NAME = "catalog.sqlite"
+EPISODE_PREFIX = "epi_"
+
+# status: recording (할당됨, 녹화 중이거나 중단됨) -> saved | failed | deleted
+STATUSES = ("recording", "saved", "failed", "deleted")
+FIELDS = ("duration", "fps", "frames", "video_frames", "missed_frames", "tactile_samples", "bytes")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    idx INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    updated REAL NOT NULL,
+    duration REAL,
+    fps REAL,
+    frames INTEGER,
+    video_frames INTEGER,
+    missed_frames INTEGER,
+    tactile_samples INTEGER,
+    bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS episodes_status ON episodes (status);
+"""
+
+
+def episode_name(idx):
+    return f"{EPISODE_PREFIX}{idx:06d}"
+
+
+def directory_bytes(path):
+    total = 0
+    for entry in os.scandir(path):
+        if entry.is_file(follow_symlinks=False):
+            total += entry.stat().st_size
+    return total
+
+
+class EpisodeCatalog:
+    """SQLite catalog of the episodes in one dataset directory (base_path/catalog.sqlite).
+
+    allocate() hands out the next episode index in a write transaction, so two
+    collectors on the same dataset never get the same index. Indices are never
+    reused, also not those of deleted episodes. Every episode keeps a row with
+    its status and summary (duration, frame counts, tactile samples, bytes),
+    so dataset queries do not have to walk the directory tree.
+    A dataset recorded before the catalog existed is imported once, when the
+    catalog is created.
+    """
+
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.path = os.path.join(base_path, CATALOG_NAME)
+        os.makedirs(base_path, exist_ok=True)
+        is_new = not os.path.exists(self.path)
+        self.conn = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        if is_new:
+            self._import_existing()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _import_existing(self):
+        """카탈로그 이전에 녹화된 epi_XXXXXX 폴더를 saved로 등록 (카탈로그 생성 시 한 번만)"""
+        now = time.time()
+        rows = []
+        for entry in os.scandir(self.base_path):
+            suffix = entry.name[len(EPISODE_PREFIX):]
+            if entry.is_dir() and entry.name.startswith(EPISODE_PREFIX) and suffix.isdigit():
+                rows.append((int(suffix), entry.name, "saved", now, now, directory_bytes(entry.path)))
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany("INSERT OR IGNORE INTO episodes (idx, name, status, created, updated, bytes) "
+                                  "VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def allocate(self):
+        """다음 index를 할당하고 폴더를 만들어 (idx, episode_dir)를 반환"""
+        while True:
+            now = time.time()
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                idx = self.conn.execute("SELECT COALESCE(MAX(idx), -1) + 1 FROM episodes").fetchone()[0]
+                self.conn.execute("INSERT INTO episodes (idx, name, status, created, updated) VALUES (?, ?, ?, ?, ?)",
+                                  (idx, episode_name(idx), "recording", now, now))
+            episode_dir = os.path.join(self.base_path, episode_name(idx))
+            try:
+                os.makedirs(episode_dir)
+            except FileExistsError:
+                # 카탈로그에 없는 폴더가 이미 있으면 건드리지 않고 다음 index 사용
+                self.update(idx, status="saved", bytes=directory_bytes(episode_dir))
+                continue
+            return idx, episode_dir
+
+    def update(self, idx, status=None, **fields):
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"unknown catalog fields: {sorted(unknown)}")
+        if status is not None:
+            if status not in STATUSES:
+                raise ValueError(f"status must be one of {STATUSES}")
+            fields["status"] = status
+        fields["updated"] = time.time()
+        columns = ", ".join(f"{key} = ?" for key in fields)
+        with self.conn:
+            self.conn.execute(f"UPDATE episodes SET {columns} WHERE idx = ?", (*fields.values(), idx))
+
+    def get(self, idx):
+        row = self.conn.execute("SELECT * FROM episodes WHERE idx = ?", (idx,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def episodes(self, status="saved"):
+        """status의 에피소드 row 리스트 (status=None이면 전부), index 순"""
+        if status is None:
+            rows = self.conn.execute("SELECT * FROM episodes ORDER BY idx")
+        else:
+            rows = self.conn.execute("SELECT * FROM episodes WHERE status = ? ORDER BY idx", (status,))
+        return [dict(row) for row in rows]
+
+    def summary(self):
+        """status별 에피소드 수, 총 길이, 프레임 수, tactile 샘플 수, 바이트"""
+        rows = self.conn.execute(
+            "SELECT status, COUNT(*) AS episodes, SUM(duration) AS duration, SUM(frames) AS frames, "
+            "SUM(tactile_samples) AS tactile_samples, SUM(bytes) AS bytes FROM episodes GROUP BY status")
+        return {row["status"]: dict(row) for row in rows}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query the episode catalog of a dataset.')
+    parser.add_argument('dataset', type=str, help='Dataset directory holding catalog.sqlite')
+    parser.add_argument('--list', action='store_true', help='List the episodes instead of the summary')
+    parser.add_argument('--status', type=str, default='saved', choices=STATUSES + ('all',),
+                        help='Status of the listed episodes')
+    args = parser.parse_args()
+
+    with EpisodeCatalog(args.dataset) as catalog:
+        if args.list:
+            for episode in catalog.episodes(None if args.status == 'all' else args.status):
+                print(f"{episode['name']}  {episode['status']:9s}  duration {episode['duration']}  "
+                      f"frames {episode['frames']}  tactile {episode['tactile_samples']}  bytes {episode['bytes']}")
+        else:
+            for status, row in catalog.summary().items():
+                print(f"{status:9s} episodes {row['episodes']:6d}  duration {row['duration'] or 0:.1f}s  "
+                      f"frames {row['frames'] or 0}  tactile {row['tactile_samples'] or 0}  bytes {row['bytes'] or 0}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import time
+import threading
+from collections import deque
+
+
+class FrameEncoder:
+    """Feeds one cv2.VideoWriter from its own thread.
+
+    submit() queues a frame and returns at once unless the queue is full.
+    What happens then depends on policy:
+
+      block       : wait until the encoder takes a frame (the old behaviour)
+      drop_oldest : discard the oldest queued frame to make room
+      drop_newest : discard the submitted frame
+
+    Dropped frames are counted and their submit index is kept, so video
+    frames can be matched to tactile frames again. Late frames, whose
+    encoding started more than late_after seconds after submit(), are
+    counted too.
+    VideoWriter.write releases the GIL while encoding, so one thread per
+    eye runs the two encoders in parallel.
+    """
+
+    POLICIES = ("block", "drop_oldest", "drop_newest")
+
+    def __init__(self, writer, max_pending=10, policy="block", late_after=0.1):
+        if policy not in self.POLICIES:
+            raise ValueError(f"policy must be one of {self.POLICIES}")
+        self.writer = writer
+        self.max_pending = max_pending
+        self.policy = policy
+        self.late_after = late_after
+        self.pending = deque()
+        self.cond = threading.Condition()
+        self.is_closed = False
+        self.thread = None
+
+        self.submitted_count = 0
+        self.written_count = 0
+        self.dropped_count = 0
+        self.dropped_frames = []
+        self.late_count = 0
+        self.blocked_time = 0.0
+        self.max_pending_seen = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self._encode_loop)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def submit(self, frame):
+        """프레임을 큐에 넣음. drop_newest로 버려지면 False"""
+        with self.cond:
+            index = self.submitted_count
+            self.submitted_count += 1
+            if len(self.pending) >= self.max_pending:
+                if self.policy == "drop_newest":
+                    self.dropped_count += 1
+                    self.dropped_frames.append(index)
+                    return False
+                if self.policy == "drop_oldest":
+                    self.dropped_frames.append(self.pending.popleft()[1])
+                    self.dropped_count += 1
+                else:
+                    block_start = time.perf_counter()
+                    self.cond.wait_for(lambda: len(self.pending) < self.max_pending)
+                    self.blocked_time += time.perf_counter() - block_start
+            self.pending.append((time.perf_counter(), index, frame))
+            self.max_pending_seen = max(self.max_pending_seen, len(self.pending))
+            self.cond.notify_all()
+        return True
+
+    def _encode_loop(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or self.is_closed)
+                if not self.pending:
+                    break
+                submit_time, _, frame = self.pending.popleft()
+                self.cond.notify_all()
+            if time.perf_counter() - submit_time > self.late_after:
+                self.late_count += 1
+            self.writer.write(frame)
+            self.written_count += 1
+
+    def close(self):
+        """남은 프레임을 모두 인코딩한 뒤 스레드 종료"""
+        with self.cond:
+            self.is_closed = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def get_stats(self):
+        return {
+            "policy": self.policy,
+            "submitted": self.submitted_count,
+            "written": self.written_count,
+            "dropped": self.dropped_count,
+            "dropped_frames": sorted(self.dropped_frames),
+            "late": self.late_count,
+            "blocked_s": self.blocked_time,
+            "max_pending": self.max_pending_seen,
+        }
@@ -4,38 +4,62 @@ import time
 import json
 import random
 import shutil
-import threading
-from queue import Queue
 
 import numpy as np 
 import episode_manager.utils as utils
-from hday import Robot  
+from episode_manager.tactile_log import TactileStreamLog, remove_tactile_log
+from episode_manager.tactile_file import save_episode_tactile, export_json
+from episode_manager.scheduler import FrameScheduler
+from episode_manager.camera import CameraSession
+from episode_manager.encoder import FrameEncoder
+from episode_manager.tactile_session import TactileSession, BaselineEstimator
+from episode_manager.catalog import EpisodeCatalog, episode_name, directory_bytes
 
 import warnings
 warnings.filterwarnings("ignore")
 
 
 class EpisodeRecorder:
-    def __init__(self, episode_dir, record_duration=4.0, fps=20.0, tactile_port="/dev/ttyACM0"):
+    def __init__(self, episode_dir, record_duration=4.0, fps=20.0, tactile_port="/dev/ttyACM0", save_json=False,
+                 encode_policy="block", encode_queue=10, camera=None, tactile_session=None):
         self.episode_dir = episode_dir
         self.record_duration = record_duration
         self.fps = fps
         self.tactile_port = tactile_port
+        # camera(CameraSession)가 주어지면 열린 카메라를 그대로 쓰고 에피소드가 끝나도 닫지 않음
+        self.camera = camera
+        self.owns_camera = camera is None
         self.cap = None
+        self.grabber = None
         self.left_writer = None
         self.right_writer = None
-        self.tactile_data_list = []
+        # 패킷과 프레임은 모두 tactile 로그에 스트리밍 (메모리에 쌓지 않음)
+        self.stream_log = None
         self.half_width = None
         self.height = None
         self.fourcc = cv2.VideoWriter_fourcc(*'avc1')
         self.left_video_path = os.path.join(episode_dir, "left_video.mp4")
         self.right_video_path = os.path.join(episode_dir, "right_video.mp4")
+        self.tactile_path = os.path.join(episode_dir, "tactile.bin")
         self.tactile_json_path = os.path.join(episode_dir, "tactile.json")
+        self.save_json = save_json  # 호환용 tactile.json도 함께 저장
+        self.tactile_stream_path = os.path.join(episode_dir, "tactile_stream.bin")
+        self.link_stats_path = os.path.join(episode_dir, "link_stats.json")
+        self.link_stats = None
+        self.metadata_path = os.path.join(episode_dir, "metadata.json")
+        self.scheduler = FrameScheduler(fps)
+        self.frame_grab_offset_ms = []  # 프레임별 (grab 시각 - tick 시각)
+        self.frame_driver_ms = []       # 프레임별 드라이버 timestamp (없으면 0)
+        # 왼쪽/오른쪽 영상은 각자의 스레드에서 인코딩, 큐가 차면 encode_policy에 따라 처리
+        self.encode_policy = encode_policy
+        self.encode_queue = encode_queue
+        self.encoders = {}
         
-        self.latest_tactile = {}  
-        self.tactile_lock = threading.Lock()
-        self.tactile_stop_event = threading.Event()
+        # tactile_session이 주어지면 열려 있는 센서 스트림을 그대로 사용 (검증과 녹화가 공유)
+        self.tactile_session = tactile_session
+        self.owns_tactile_session = tactile_session is None
         self.start_time = None 
+        self.start_ns = None  # time.monotonic_ns() taken together with start_time
 
     def __enter__(self):
         self.prepare_resources()
@@ -44,153 +68,199 @@ class EpisodeRecorder:
     def __exit__(self, exc_type, exc_value, traceback):
         self.cleanup_resources()
         self.save_tactile_data()
+        self.save_link_stats()
+        self.save_metadata()
 
     def prepare_resources(self):
-        self.cap = utils.get_stereo_camera()
-        if not self.cap:
-            raise RuntimeError("Stereo camera not found.")
-        
-        ret, frame = self.cap.read()
-        if not ret:
-            self.cap.release()
-            raise RuntimeError("Failed to read a frame from the camera.")
-        
-        self.height, width, _ = frame.shape
-        self.half_width = width // 2
+        # 카메라는 별도 스레드에서 계속 grab하고 record()는 가장 가까운 프레임을 가져감
+        if self.camera is None:
+            self.camera = CameraSession()
+        self.camera.ensure_open()
+        self.cap = self.camera.cap
+        self.grabber = self.camera.grabber
         
+        self.height = self.camera.height
+        self.half_width = self.camera.width // 2
+
+        if self.tactile_session is None:
+            self.tactile_session = TactileSession(self.tactile_port)
+        self.tactile_session.ensure_open()
+
         self.left_writer = cv2.VideoWriter(self.left_video_path, self.fourcc, self.fps, (self.half_width, self.height))
         self.right_writer = cv2.VideoWriter(self.right_video_path, self.fourcc, self.fps, (self.half_width, self.height))
     
-    def camera_worker(self, frame_queue):
-        while True:
-            item = frame_queue.get()
-            if item is None:  # 종료 신호 수신 시 종료.
-                break
-            left_frame, right_frame = item
-            self.left_writer.write(left_frame)
-            self.right_writer.write(right_frame)
-    
-    def tactile_worker(self, init_tactile_table=None):
-        try:
-            with Robot(self.tactile_port) as robot:
-                robot.request_robot_enable(True)
-                while not self.tactile_stop_event.is_set():
-                    sensor_bypass_id, sensor_bypass_data = robot.getSensorBypassPacket()
-                    # 센서 id가 128~133인 경우에만 처리 (각각 [16][3] 배열로 구성됨)
-                    if sensor_bypass_id is not None and 128 <= sensor_bypass_id <= 139:
-                        tactile_timestamp = time.perf_counter() - self.start_time
-                        with self.tactile_lock:
-                            adjusted_data = sensor_bypass_data
-                            if init_tactile_table is not None:
-                                if sensor_bypass_id in init_tactile_table:
-                                    adjusted_data = sensor_bypass_data - init_tactile_table[sensor_bypass_id]
-
-                            self.latest_tactile[sensor_bypass_id] = {
-                                "data": adjusted_data,  # [16][3] 데이터
-                                "timestamp": tactile_timestamp
-                            }
-                    time.sleep(0.001)
-        except Exception as e:
-            print("Tactile thread encountered error:", e)
-            
-    def validate_sensors(self, validation_duration=5.0, validation_threshold=6):
+    def validate_sensors(self, validation_duration=5.0, validation_threshold=6, baseline_samples=20, baseline_max_std=3.0):
+        """모든 센서가 들어오고 baseline이 수렴하면 validation_duration 전이라도 바로 반환"""
         print("Validating sensors...")
         collected_ids = set()
-        self.tactile_stop_event.clear()  
-        self.start_time = time.perf_counter()
-        tactile_thread = threading.Thread(target=self.tactile_worker)
-        tactile_thread.daemon = True
-        tactile_thread.start()
+        expected_ids = set(range(128, 140))  # 128~139
+        tactile_state = self.tactile_session.state
+        # 검증 시작 이후의 보정 전 패킷만으로 센서별 평균/표준편차 계산
+        estimator = BaselineEstimator(tactile_state.sensor_ids, baseline_samples, baseline_max_std)
+        self.tactile_session.attach(estimator)
+        start_ns = time.monotonic_ns()
         
         start_time = time.perf_counter()
-        while time.perf_counter() - start_time < validation_duration:
-            with self.tactile_lock:
-                collected_ids.update(self.latest_tactile.keys())
-            time.sleep(0.01)
-        
-        self.tactile_stop_event.set()
-        tactile_thread.join()
+        try:
+            while time.perf_counter() - start_time < validation_duration:
+                _, rx_ns = tactile_state.snapshot()
+                collected_ids.update(tactile_state.sensor_ids[rx_ns >= start_ns].tolist())
+                if collected_ids >= expected_ids and estimator.converged().all():
+                    break
+                time.sleep(0.01)
+        finally:
+            self.tactile_session.detach(estimator)
         
-        expected_ids = set(range(128, 140))  # 128~139
         missing_ids = expected_ids - collected_ids
         if missing_ids:
             print("     => Validation failed. Missing sensors:", missing_ids)
             return False, {}
         
+        mean, std, ready = estimator.estimate()
+        unsettled = ~ready | (std > baseline_max_std)
+        if unsettled.any():
+            print("     => Validation failed. Sensors not settled:",
+                  {int(id): round(float(s), 1) for id, s in zip(tactile_state.sensor_ids[unsettled], std[unsettled])})
+            return False, {}
+        
+        # 이전 에피소드의 baseline에서 validation_threshold 이상 벗어난 센서만 다시 잡음
+        baseline, rebased_ids = self.tactile_session.update_baseline(mean, validation_threshold)
+        if rebased_ids:
+            print("     => Baseline updated:", rebased_ids)
+        
         #check sensor init data with threshold
         CHECK_THRESHOLD = validation_threshold
         init_tactile_table = {}
-        for id in [134, 135, 136, 137, 138, 139]:
-            data = self.latest_tactile[id]["data"]
-            if not np.all(np.abs(data) < CHECK_THRESHOLD):
-                init_tactile_table[id] = data
-                
-                
-        return True, init_tactile_table
-        
+        for row, id in enumerate(tactile_state.sensor_ids.tolist()):
+            if not np.all(np.abs(baseline[row]) < CHECK_THRESHOLD):
+                init_tactile_table[id] = baseline[row]
         
+        print(f"     => Sensors validated in {time.perf_counter() - start_time:.2f}s")
+        return True, init_tactile_table
     
     def record(self, init_tactile_table):
-        frame_queue = Queue(maxsize=10)
-        camera_thread = threading.Thread(target=self.camera_worker, args=(frame_queue,))
-        camera_thread.daemon = True
-        camera_thread.start()
-
-        tactile_thread = threading.Thread(target=self.tactile_worker, args=(init_tactile_table,))
-        tactile_thread.daemon = True
-        tactile_thread.start()
-        
-        self.start_time = time.perf_counter()
-        fps_interval = 1.0 / self.fps
-        next_frame_time = self.start_time
+        self.encoders = {
+            eye: FrameEncoder(writer, self.encode_queue, self.encode_policy, late_after=2.0 / self.fps).start()
+            for eye, writer in (("left", self.left_writer), ("right", self.right_writer))
+        }
+
+        try:
+            self.start_time = time.perf_counter()
+            self.start_ns = time.monotonic_ns()
+            self.stream_log = TactileStreamLog(self.tactile_stream_path, self.start_ns, init_tactile_table,
+                                               ports=self.tactile_session.hub.ports)
+            # 녹화 중에는 모든 패킷을 로그에 남김 (카메라 fps와 무관)
+            self.tactile_session.state.setBaseline(init_tactile_table)
+            self.tactile_session.attach(self.stream_log)
+            # link_stats.json은 에피소드 단위
+            self.tactile_session.reset_stats()
         
-        while time.perf_counter() - self.start_time < self.record_duration:
-            now = time.perf_counter()
-            if now < next_frame_time:
-                while time.perf_counter() < next_frame_time:
-                    pass
-            current_timestamp = time.perf_counter() - self.start_time
-            next_frame_time += fps_interval
-            
-            ret, frame = self.cap.read()
-            if not ret:
+            # 대부분은 sleep, 마지막 0.5ms만 spin하며 프레임 시각을 맞춤
+            self.grabber.set_decoding(True)
+            if not self.grabber.wait_first(timeout=1.0):
                 print("Error: Failed to read frame")
-                break
+            self.grabber.reset_counters()
+            self.scheduler.start(self.start_time)
+        
+            while time.perf_counter() - self.start_time < self.record_duration:
+                self.scheduler.wait()
+                tick_ns = time.monotonic_ns()
+                current_timestamp = time.perf_counter() - self.start_time
             
-            left_frame = frame[:, :self.half_width]
-            right_frame = frame[:, self.half_width:]
+                picked = self.grabber.pick(tick_ns)
+                if picked is None:
+                    print("Error: Failed to read frame")
+                    break
+                frame, grab_ns, driver_ms, _ = picked
+                self.frame_grab_offset_ms.append(round((grab_ns - tick_ns) / 1e6, 4))
+                self.frame_driver_ms.append(driver_ms)
             
-            frame_queue.put((left_frame, right_frame))
+                left_frame = frame[:, :self.half_width]
+                right_frame = frame[:, self.half_width:]
             
-            with self.tactile_lock:
-                tactile_snapshot = self.latest_tactile.copy()
+                self.encoders["left"].submit(left_frame)
+                self.encoders["right"].submit(right_frame)
             
-            self.tactile_data_list.append({
-                "timestamp": f'{current_timestamp:.2f}',
-                "tactile": tactile_snapshot
-            })
-        
-        self.tactile_stop_event.set()
-        tactile_thread.join()
+                # 프레임의 촉각 데이터는 로그 위치로만 기록하고, 저장할 때 로그에서 복원
+                self.stream_log.add_frame(current_timestamp)
+        finally:
+            # 녹화가 끝나면 grab만 계속 (카메라 유지)
+            self.grabber.set_decoding(False)
+            # 실패해도 세션에 sink가 남지 않고, writer를 release하기 전에 encoder 스레드가 끝나도록
+            if self.stream_log is not None:
+                self.tactile_session.detach(self.stream_log)
+            for encoder in self.encoders.values():
+                encoder.close()
         
-        frame_queue.put(None)
-        camera_thread.join()
+        self.stream_log.close()
+        self.link_stats = self.tactile_session.get_stats()
+        self.tactile_session.report_health()
     
     def cleanup_resources(self):
-        if self.cap:
-            self.cap.release()
+        if self.owns_camera and self.camera is not None:
+            self.camera.close()
+        if self.owns_tactile_session and self.tactile_session is not None:
+            self.tactile_session.close()
         if self.left_writer:
             self.left_writer.release()
         if self.right_writer:
             self.right_writer.release()
     
     def save_tactile_data(self):
-        with open(self.tactile_json_path, "w") as f:
-            json.dump(self.tactile_data_list, f)
+        # tactile 로그와 프레임별 로그 위치를 열 단위 바이너리(tactile.bin)로 저장
+        if self.stream_log is None:
+            return
+        self.stream_log.close()
+        save_episode_tactile(self.tactile_path, self.tactile_stream_path)
+        remove_tactile_log(self.tactile_stream_path)
+        if self.save_json:
+            export_json(self.tactile_path, self.tactile_json_path)
+
+    def save_metadata(self):
+        """녹화 설정과 프레임 스케줄링 결과 (프레임별 오차, 놓친 프레임, 실제 fps)"""
+        if self.scheduler.start_time is None:
+            return
+        metadata = {
+            "fps": self.fps,
+            "record_duration": self.record_duration,
+            "tactile_port": self.tactile_port,
+            "schedule": self.scheduler.get_stats(),
+        }
+        if self.encoders:
+            metadata["encoder"] = {eye: encoder.get_stats() for eye, encoder in self.encoders.items()}
+        if self.grabber is not None:
+            metadata["camera"] = dict(self.grabber.get_stats(),
+                                      grab_offset_ms=self.frame_grab_offset_ms,
+                                      driver_ms=self.frame_driver_ms)
+        with open(self.metadata_path, "w") as f:
+            json.dump(metadata, f, indent=2)
+
+    def get_summary(self):
+        """카탈로그에 남길 에피소드 요약"""
+        summary = {"fps": self.fps, "bytes": directory_bytes(self.episode_dir)}
+        if self.scheduler.start_time is not None:
+            schedule = self.scheduler.get_stats()
+            summary["frames"] = schedule["frames"]
+            summary["missed_frames"] = schedule["missed_deadlines"]
+            if schedule["frames"] > 1:
+                summary["duration"] = (schedule["frames"] - 1) / schedule["actual_fps"]
+        if self.encoders:
+            summary["video_frames"] = min(encoder.written_count for encoder in self.encoders.values())
+        if self.stream_log is not None:
+            summary["tactile_samples"] = self.stream_log.written_count
+        return summary
+
+    def save_link_stats(self):
+        """Serial link statistics of the last tactile session, to spot a saturated link per episode."""
+        if self.link_stats is None:
+            return
+        with open(self.link_stats_path, "w") as f:
+            json.dump(self.link_stats, f, indent=2)
 
 
 class EpisodeManager:
-    def __init__(self, base_path, start_sound_path, end_sound_path, tactile_port, fps=20.0, record_duration=4.0):
+    def __init__(self, base_path, start_sound_path, end_sound_path, tactile_port, fps=20.0, record_duration=4.0, save_json=False,
+                 encode_policy="block", baseline_samples=20, baseline_max_std=3.0):
         self.base_path = base_path
         self.start_sound_path = start_sound_path
         self.end_sound_path = end_sound_path
@@ -199,20 +269,41 @@ class EpisodeManager:
         self.fps = fps
         self.record_duration = record_duration
         self.tactile_port = tactile_port
+        self.save_json = save_json
+        self.encode_policy = encode_policy
+        # 센서 검증: 센서별 baseline_samples개 평균, 표준편차가 baseline_max_std 이하면 통과 (x2 스케일 값 기준)
+        self.baseline_samples = baseline_samples
+        self.baseline_max_std = baseline_max_std
+        # 카메라는 에피소드 사이에도 열어 둠 (노출 안정화, 장치 재검색 생략)
+        self.camera = CameraSession()
+        # 센서도 실행 내내 열고 enable한 상태로 유지
+        self.tactile_session = TactileSession(tactile_port)
+        # 다음 에피소드 번호와 에피소드별 요약은 base_path/catalog.sqlite에서 관리
+        self.catalog = EpisodeCatalog(base_path)
         self.intro_message = f"""
             Notice: The recording will automatically stop after {self.record_duration} seconds.
             It will record at {self.fps} fps.
             If you wish to delete the recording, type 'del'.
             To continue, press 'enter'.
             """
-        if not os.path.exists(base_path):
-            os.makedirs(base_path)
     
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.camera.close()
+        self.tactile_session.close()
+        self.catalog.close()
+
     def get_next_episode_dir(self):
-        idx = utils.get_next_episode_index(self.base_path)
-        episode_dir = os.path.join(self.base_path, f"epi_{idx:06d}")
-        os.makedirs(episode_dir)
-        return idx, episode_dir
+        return self.catalog.allocate()
+
+    def delete_episode(self, idx):
+        shutil.rmtree(os.path.join(self.base_path, episode_name(idx)), ignore_errors=True)
+        self.catalog.update(idx, status="deleted")
     
     def _play_start_sounds(self):
         utils.play_sound(os.path.join(self.start_sound_path, self.start_sound_list[random.randint(0, len(self.start_sound_list) - 1)]))
@@ -228,8 +319,12 @@ class EpisodeManager:
         
         print("     => Preparing for recording")
         try:
-            with EpisodeRecorder(episode_dir, self.record_duration, self.fps, tactile_port=self.tactile_port) as recorder:
-                success, init_tactile_table = recorder.validate_sensors(validation_duration=2.0, validation_threshold=10)
+            with EpisodeRecorder(episode_dir, self.record_duration, self.fps, tactile_port=self.tactile_port,
+                                 save_json=self.save_json, encode_policy=self.encode_policy,
+                                 camera=self.camera, tactile_session=self.tactile_session) as recorder:
+                success, init_tactile_table = recorder.validate_sensors(validation_duration=2.0, validation_threshold=10,
+                                                                                 baseline_samples=self.baseline_samples,
+                                                                                 baseline_max_std=self.baseline_max_std)
                 if not success:
                     raise RuntimeError("Validation failed. Please check the sensors.")
                 
@@ -240,8 +335,11 @@ class EpisodeManager:
         except Exception as e:
             print(f"Recording failed: {e}")
             shutil.rmtree(episode_dir)
+            self.catalog.update(idx, status="failed")
             return False, idx
 
+        self.catalog.update(idx, status="saved", **recorder.get_summary())
+
         print("     => Recording finished")
         self._play_end_sounds()
         print("================")
@@ -0,0 +1,209 @@
+import os
+import glob
+import json
+import shutil
+import tarfile
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from episode_manager.catalog import CATALOG_NAME, EpisodeCatalog
+from episode_manager.tactile_file import TactileFile, write_tactile_file, convert_json
+
+# export 결과: 에피소드 여러 개를 묶은 큰 tar shard와 member 위치 index
+#
+#   out_dir/shard_000000.tar  : epi_XXXXXX/tactile.bin, left_video.mp4, right_video.mp4, metadata.json ...
+#   out_dir/index.json        : {"frame_step", "shards": [{"name", "bytes", "episodes",
+#                                "members": [[episode, member, offset, size], ...]}]}
+#
+# 압축하지 않은 tar라 shard 하나를 open 한 번, 순차 읽기 한 번으로 스트리밍할 수 있고
+# index의 offset으로 member를 바로 읽을 수도 있다 (tactile.bin은 TactileFile(shard, offset)로 memmap).
+
+SHARD_PREFIX = "shard_"
+INDEX_NAME = "index.json"
+VIDEO_NAMES = ("left_video.mp4", "right_video.mp4")
+EXTRA_NAMES = ("metadata.json", "link_stats.json")
+
+
+def list_episodes(dataset):
+    """catalog가 있으면 saved 에피소드, 없으면 epi_* 폴더 전체 (index 순)"""
+    if os.path.exists(os.path.join(dataset, CATALOG_NAME)):
+        with EpisodeCatalog(dataset) as catalog:
+            names = [episode["name"] for episode in catalog.episodes("saved")]
+        return [os.path.join(dataset, name) for name in names if os.path.isdir(os.path.join(dataset, name))]
+    return sorted(path for path in glob.glob(os.path.join(dataset, "epi_*")) if os.path.isdir(path))
+
+
+def episode_bytes(episode_dir):
+    total = 0
+    for name in ("tactile.bin", "tactile.json") + VIDEO_NAMES + EXTRA_NAMES:
+        path = os.path.join(episode_dir, name)
+        if os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+
+def plan_shards(episode_dirs, shard_bytes):
+    """에피소드 순서를 유지하며 shard_bytes를 넘지 않게 묶음 (에피소드 하나가 더 크면 단독 shard)"""
+    shards = []
+    current, current_bytes = [], 0
+    for episode_dir in episode_dirs:
+        size = episode_bytes(episode_dir)
+        if current and current_bytes + size > shard_bytes:
+            shards.append(current)
+            current, current_bytes = [], 0
+        current.append(episode_dir)
+        current_bytes += size
+    if current:
+        shards.append(current)
+    return shards
+
+
+def subsample_tactile(path, out_path, frame_step):
+    """패킷은 모두 두고 프레임 열만 frame_step마다 하나씩 남긴 tactile.bin"""
+    tactile = TactileFile(path)
+    columns = dict(tactile.columns)
+    columns["frame_time"] = tactile.frame_time[::frame_step]
+    columns["frame_index"] = tactile.frame_index[::frame_step]
+    header = {key: value for key, value in tactile.header.items() if key != "columns"}
+    header["frame_step"] = frame_step * header.get("frame_step", 1)
+    write_tactile_file(out_path, header, columns)
+
+
+def subsample_video(path, out_path, frame_step, fourcc="avc1"):
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 20.0
+    size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    writer = cv2.VideoWriter(out_path, cv2.VideoWriter_fourcc(*fourcc), fps / frame_step, size)
+    if not writer.isOpened():
+        cap.release()
+        raise RuntimeError(f"Cannot open a {fourcc} video writer for {out_path}")
+    frame_idx = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if frame_idx % frame_step == 0:
+            writer.write(frame)
+        frame_idx += 1
+    writer.release()
+    cap.release()
+
+
+def episode_members(episode_dir, work_dir, frame_step=1, fourcc="avc1"):
+    """shard에 넣을 (member 이름, 파일 경로) 리스트. 변환이 필요한 파일은 work_dir에 만든다."""
+    members = []
+    tactile_path = os.path.join(episode_dir, "tactile.bin")
+    if not os.path.exists(tactile_path) and os.path.exists(os.path.join(episode_dir, "tactile.json")):
+        tactile_path = os.path.join(work_dir, "tactile.bin")
+        convert_json(os.path.join(episode_dir, "tactile.json"), tactile_path)
+    if os.path.exists(tactile_path):
+        if frame_step > 1:
+            out_path = os.path.join(work_dir, "tactile_subsampled.bin")
+            subsample_tactile(tactile_path, out_path, frame_step)
+            tactile_path = out_path
+        members.append(("tactile.bin", tactile_path))
+
+    for name in VIDEO_NAMES:
+        path = os.path.join(episode_dir, name)
+        if not os.path.exists(path):
+            continue
+        if frame_step > 1:
+            out_path = os.path.join(work_dir, name)
+            subsample_video(path, out_path, frame_step, fourcc)
+            path = out_path
+        members.append((name, path))
+
+    for name in EXTRA_NAMES:
+        path = os.path.join(episode_dir, name)
+        if os.path.exists(path):
+            members.append((name, path))
+    return members
+
+
+def pack_shard(shard_path, episode_dirs, frame_step=1, fourcc="avc1"):
+    """에피소드들을 shard_path(tar)로 묶고 shard index 항목을 반환 (process pool worker)"""
+    tmp_path = shard_path + ".tmp"
+    with tarfile.open(tmp_path, "w", format=tarfile.PAX_FORMAT) as tar:
+        for episode_dir in episode_dirs:
+            episode = os.path.basename(os.path.normpath(episode_dir))
+            work_dir = tempfile.mkdtemp(prefix=episode + "_")
+            try:
+                for name, path in episode_members(episode_dir, work_dir, frame_step, fourcc):
+                    tar.add(path, arcname=f"{episode}/{name}", recursive=False)
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    os.replace(tmp_path, shard_path)
+
+    # 헤더만 건너뛰며 읽어 member 데이터 위치를 기록
+    members = []
+    with tarfile.open(shard_path, "r") as tar:
+        for info in tar:
+            episode, name = info.name.split("/", 1)
+            members.append([episode, name, info.offset_data, info.size])
+    return {
+        "name": os.path.basename(shard_path),
+        "bytes": os.path.getsize(shard_path),
+        "episodes": [os.path.basename(os.path.normpath(path)) for path in episode_dirs],
+        "members": members,
+    }
+
+
+def export_dataset(dataset, out_dir, shard_bytes=1 << 30, workers=None, frame_step=1, fourcc="avc1"):
+    """dataset의 에피소드를 out_dir에 shard로 내보내고 index를 반환"""
+    if frame_step < 1:
+        raise ValueError("frame_step must be 1 or larger")
+    os.makedirs(out_dir, exist_ok=True)
+    shards = plan_shards(list_episodes(dataset), shard_bytes)
+    shard_paths = [os.path.join(out_dir, f"{SHARD_PREFIX}{idx:06d}.tar") for idx in range(len(shards))]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        entries = list(pool.map(pack_shard, shard_paths, shards,
+                                [frame_step] * len(shards), [fourcc] * len(shards)))
+
+    index = {"dataset": os.path.abspath(dataset), "frame_step": frame_step, "shards": entries}
+    tmp_path = os.path.join(out_dir, INDEX_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(out_dir, INDEX_NAME))
+    return index
+
+
+def read_index(out_dir):
+    with open(os.path.join(out_dir, INDEX_NAME), "r") as f:
+        return json.load(f)
+
+
+def iter_shard(shard_path):
+    """shard를 처음부터 순차로 읽으며 (episode, member 이름, bytes)를 차례로 반환"""
+    with tarfile.open(shard_path, "r|") as tar:
+        for info in tar:
+            episode, name = info.name.split("/", 1)
+            yield episode, name, tar.extractfile(info).read()
+
+
+def shard_tactile(shard_path, offset):
+    """index의 offset에 있는 tactile.bin을 shard에서 바로 memmap"""
+    return TactileFile(shard_path, offset)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pack episodes into sequential tar shards for training.')
+    parser.add_argument('dataset', type=str, help='Dataset directory holding epi_XXXXXX folders')
+    parser.add_argument('out', type=str, help='Output directory for the shards and index.json')
+    parser.add_argument('--shard_mb', type=float, default=1024.0, help='Target shard size in MB')
+    parser.add_argument('--workers', type=int, default=None, help='Processes packing shards (default: CPU count)')
+    parser.add_argument('--frame_step', type=int, default=1, help='Keep every n-th camera frame (videos are re-encoded)')
+    parser.add_argument('--fourcc', type=str, default='avc1', help='Codec of re-encoded videos')
+    args = parser.parse_args()
+
+    index = export_dataset(args.dataset, args.out, int(args.shard_mb * (1 << 20)), args.workers,
+                           args.frame_step, args.fourcc)
+    episodes = sum(len(shard["episodes"]) for shard in index["shards"])
+    total = sum(shard["bytes"] for shard in index["shards"])
+    print(f"{episodes} episodes -> {len(index['shards'])} shards, {total / (1 << 20):.1f} MB in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
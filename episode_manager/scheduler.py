@@ -0,0 +1,86 @@
+import time
+
+import numpy as np
+
+
+class FrameScheduler:
+    """Paces a capture loop at a fixed rate without pinning a core.
+
+    wait() sleeps until `spin` seconds before the next deadline and only
+    busy-waits for that last fraction, so the GIL stays free for the tactile
+    and encoder threads. The error (wake-up time minus deadline) of every
+    frame is kept. When a frame is late by a whole period or more, the
+    deadlines it overran are counted as missed and skipped instead of being
+    caught up back to back.
+    """
+
+    def __init__(self, fps, spin=0.0005, skip_missed=True):
+        self.period = 1.0 / fps
+        self.fps = fps
+        self.spin = spin
+        self.skip_missed = skip_missed
+        self.start_time = None
+        self.next_time = None
+        self.errors = []
+        self.first_time = None
+        self.last_time = None
+        self.missed_count = 0
+        self.sleep_time = 0.0
+        self.spin_time = 0.0
+
+    def start(self, start_time=None):
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.next_time = self.start_time
+        self.errors = []
+        self.first_time = None
+        self.last_time = None
+        self.missed_count = 0
+        self.sleep_time = 0.0
+        self.spin_time = 0.0
+
+    def wait(self):
+        """다음 프레임 시각까지 대기하고 그 시각(deadline)과 실제 시각의 차이를 반환"""
+        deadline = self.next_time
+        now = time.perf_counter()
+        remain = deadline - now - self.spin
+        if remain > 0:
+            time.sleep(remain)
+            self.sleep_time += time.perf_counter() - now
+        spin_start = time.perf_counter()
+        while time.perf_counter() < deadline:
+            pass
+        now = time.perf_counter()
+        self.spin_time += now - spin_start
+
+        error = now - deadline
+        self.errors.append(error)
+        if self.first_time is None:
+            self.first_time = now
+        self.last_time = now
+        self.next_time = deadline + self.period
+        if self.skip_missed and now >= self.next_time:
+            missed = int((now - deadline) / self.period)
+            self.missed_count += missed
+            self.next_time += missed * self.period
+        return error
+
+    def get_stats(self):
+        """에피소드 metadata에 남길 스케줄링 통계 (단위: ms)"""
+        errors = np.array(self.errors, dtype=np.float64) * 1000.0
+        span = self.last_time - self.first_time if self.first_time is not None else 0.0
+        stats = {
+            "target_fps": self.fps,
+            "frames": len(errors),
+            "missed_deadlines": self.missed_count,
+            "actual_fps": (len(errors) - 1) / span if span > 0 else 0.0,
+            "sleep_s": self.sleep_time,
+            "spin_s": self.spin_time,
+            "error_ms": errors.round(4).tolist(),
+        }
+        if len(errors):
+            stats.update({
+                "error_mean_ms": float(errors.mean()),
+                "error_p99_ms": float(np.percentile(errors, 99)),
+                "error_max_ms": float(errors.max()),
+            })
+        return stats
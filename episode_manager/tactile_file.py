@@ -0,0 +1,282 @@
+import os
+import json
+import glob
+import struct
+import argparse
+
+import numpy as np
+
+from episode_manager.tactile_log import SENSOR_IDS, read_tactile_log, remove_tactile_log
+from episode_manager.catalog import CATALOG_NAME, EPISODE_PREFIX, EpisodeCatalog, directory_bytes
+
+# tactile.bin: 에피소드 하나의 촉각 데이터를 열(column) 단위 고정 dtype 배열로 저장하는 파일
+#
+#   magic "TACT" | version u16 | header_len u32 | JSON header | columns...
+#
+# header의 "columns"에 각 열의 dtype, shape, offset이 있고 모든 열은 64바이트 정렬이라
+# np.memmap으로 복사 없이 바로 읽을 수 있다.
+#
+#   packet 열 (수신한 모든 sensor bypass 패킷, 수신 순서)
+#     rx_ns       int64  (N,)        수신 시각 (time.monotonic_ns)
+#     port        uint8  (N,)        header "ports"의 index
+#     id          uint8  (N,)        센서 id
+#     values      int16  (N, 16, 3)  보정 전 값 (x2 스케일 적용)
+#   frame 열 (카메라 프레임)
+#     frame_time  float64 (F,)       녹화 시작 후 경과 시간 [s]
+#     frame_index int64  (F, S)      프레임 시점의 센서별 최신 패킷 위치, 없으면 -1
+#
+# 보정값은 header "baseline" (S, 16, 3)에 있고 읽을 때 values에서 뺀다.
+
+FILE_MAGIC = b"TACT"
+FILE_VERSION = 1
+FILE_PREFIX = struct.Struct("<4sHI")
+COLUMN_ALIGN = 64
+WRITE_CHUNK = 65536   # 열을 나눠서 쓰는 행 수 (memmap 열을 통째로 메모리에 올리지 않도록)
+
+
+def write_tactile_file(path, header, columns):
+    """header(dict)와 columns({이름: 배열})를 tactile.bin 형식으로 저장"""
+    layout = {}
+    offset = 0
+    for name, array in columns.items():
+        offset += -offset % COLUMN_ALIGN
+        layout[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+
+    header = dict(header, columns=layout)
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = FILE_PREFIX.size + len(header_bytes)
+    data_start += -data_start % COLUMN_ALIGN
+    header_bytes += b" " * (data_start - FILE_PREFIX.size - len(header_bytes))
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(FILE_PREFIX.pack(FILE_MAGIC, FILE_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        for name, array in columns.items():
+            f.seek(data_start + layout[name]["offset"])
+            for start in range(0, len(array), WRITE_CHUNK):
+                f.write(np.ascontiguousarray(array[start:start + WRITE_CHUNK]).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class TactileFile:
+    """tactile.bin 읽기. 열은 memmap이라 필요한 부분만 디스크에서 읽힌다.
+
+    offset은 다른 파일 안에 들어 있는 tactile.bin의 시작 위치 (예: export shard의 tar member).
+    """
+
+    def __init__(self, path, offset=0):
+        self.path = path
+        with open(path, "rb") as f:
+            f.seek(offset)
+            magic, version, header_len = FILE_PREFIX.unpack(f.read(FILE_PREFIX.size))
+            if magic != FILE_MAGIC:
+                raise ValueError(f"{path} is not a tactile file")
+            self.header = json.loads(f.read(header_len).decode("utf-8"))
+        data_start = offset + FILE_PREFIX.size + header_len
+
+        self.start_ns = self.header["start_ns"]
+        self.sensor_ids = self.header["sensor_ids"]
+        self.baseline = np.array(self.header["baseline"], dtype=np.int16)
+        self.columns = {}
+        for name, column in self.header["columns"].items():
+            shape = tuple(column["shape"])
+            if 0 in shape:
+                self.columns[name] = np.zeros(shape, dtype=column["dtype"])
+            else:
+                self.columns[name] = np.memmap(path, dtype=column["dtype"], mode="r",
+                                               offset=data_start + column["offset"], shape=shape)
+
+    def __getattr__(self, name):
+        columns = self.__dict__.get("columns", {})
+        if name in columns:
+            return columns[name]
+        raise AttributeError(name)
+
+    def __len__(self):
+        return len(self.columns["frame_time"])
+
+    def frame(self, frame_idx):
+        """프레임 하나의 (보정된 values (S, 16, 3), rx_ns (S,), valid (S,))"""
+        index = np.asarray(self.frame_index[frame_idx])
+        valid = index >= 0
+        position = np.where(valid, index, 0)
+        values = np.zeros((len(self.sensor_ids), 16, 3), dtype=np.int16)
+        rx_ns = np.zeros(len(self.sensor_ids), dtype=np.int64)
+        if len(self.rx_ns):
+            values[valid] = self.values[position[valid]] - self.baseline[valid]
+            rx_ns[valid] = self.rx_ns[position[valid]]
+        return values, rx_ns, valid
+
+    def to_json_list(self):
+        """기존 tactile.json과 같은 구조의 리스트"""
+        tactile_data_list = []
+        for frame_idx in range(len(self)):
+            values, rx_ns, valid = self.frame(frame_idx)
+            tactile_snapshot = {}
+            for column, sensor_id in enumerate(self.sensor_ids):
+                if not valid[column]:
+                    continue
+                tactile_snapshot[str(sensor_id)] = {
+                    "data": values[column].tolist(),
+                    "timestamp": (int(rx_ns[column]) - self.start_ns) / 1e9,
+                    "rx_ns": int(rx_ns[column])
+                }
+            tactile_data_list.append({
+                "timestamp": f'{float(self.frame_time[frame_idx]):.2f}',
+                "tactile": tactile_snapshot
+            })
+        return tactile_data_list
+
+
+def save_episode_tactile(path, log_path, use_checkpoint=True):
+    """tactile_stream.bin/.frames로 tactile.bin을 만든다. 열 단위로 나눠 쓰므로 메모리 사용량이 일정하다."""
+    header, records, frames = read_tactile_log(log_path, use_checkpoint)
+    sensor_ids = header["sensor_ids"]
+    frame_index = np.asarray(frames["index"])
+    # 잘린 로그에서는 남아 있지 않은 record를 가리킬 수 있음
+    frame_index = np.where(frame_index < len(records), frame_index, -1)
+    columns = {
+        "rx_ns": records["rx_ns"],
+        "port": records["port"],
+        "id": records["id"],
+        "values": records["values"],
+        "frame_time": frames["frame_time"],
+        "frame_index": frame_index.reshape(len(frames), len(sensor_ids)),
+    }
+    write_tactile_file(path, {
+        "start_ns": header["start_ns"],
+        "sensor_ids": sensor_ids,
+        "ports": header["ports"],
+        "baseline": header["baseline"],
+    }, columns)
+
+
+def convert_json(json_path, path):
+    """기존 tactile.json을 tactile.bin으로 변환.
+
+    예전 파일에는 보정값과 수신 시각(ns)이 없으므로 보정된 값을 그대로 values에 넣고
+    baseline은 0, rx_ns는 센서 timestamp(녹화 시작 기준 초)로부터 만든다 (start_ns = 0).
+    프레임마다 반복되는 같은 패킷은 한 번만 저장한다.
+    """
+    with open(json_path, "r") as f:
+        data = json.load(f)
+
+    sensor_ids = list(SENSOR_IDS)
+    packets = {}
+    start_ns = None
+    frame_times = np.zeros(len(data), dtype=np.float64)
+    frame_keys = [[None] * len(sensor_ids) for _ in data]
+    for frame_idx, frame in enumerate(data):
+        frame_times[frame_idx] = float(frame.get("timestamp", 0))
+        for sensor_key, sensor in (frame.get("tactile") or {}).items():
+            sensor_id = int(sensor_key)
+            if sensor_id not in sensor_ids:
+                continue
+            rx_ns = int(sensor.get("rx_ns", round(float(sensor["timestamp"]) * 1e9)))
+            if start_ns is None and "rx_ns" in sensor:
+                # rx_ns가 있는 파일은 절대 시각이므로 timestamp로부터 start_ns를 복원
+                start_ns = rx_ns - round(float(sensor["timestamp"]) * 1e9)
+            key = (rx_ns, sensor_id)
+            if key not in packets:
+                packets[key] = np.asarray(sensor["data"], dtype=np.int16).reshape(16, 3)
+            frame_keys[frame_idx][sensor_ids.index(sensor_id)] = key
+
+    keys = sorted(packets)
+    position = {key: idx for idx, key in enumerate(keys)}
+    frame_index = np.array([[position[key] if key is not None else -1 for key in row] for row in frame_keys],
+                           dtype=np.int64).reshape(len(data), len(sensor_ids))
+    columns = {
+        "rx_ns": np.array([key[0] for key in keys], dtype=np.int64),
+        "port": np.zeros(len(keys), dtype=np.uint8),
+        "id": np.array([key[1] for key in keys], dtype=np.uint8),
+        "values": np.array([packets[key] for key in keys], dtype=np.int16).reshape(len(keys), 16, 3),
+        "frame_time": frame_times,
+        "frame_index": frame_index,
+    }
+    write_tactile_file(path, {
+        "start_ns": start_ns or 0,
+        "sensor_ids": sensor_ids,
+        "ports": [],
+        "baseline": np.zeros((len(sensor_ids), 16, 3), dtype=np.int16).tolist(),
+        "converted_from": os.path.basename(json_path),
+    }, columns)
+
+
+def recover_episode(episode_dir, use_checkpoint=True):
+    """녹화 중 중단되어 tactile_stream.bin만 남은 에피소드에서 tactile.bin을 만든다"""
+    log_path = os.path.join(episode_dir, "tactile_stream.bin")
+    path = os.path.join(episode_dir, "tactile.bin")
+    if not os.path.exists(log_path):
+        return False
+    save_episode_tactile(path, log_path, use_checkpoint)
+    remove_tactile_log(log_path)
+    update_catalog(episode_dir)
+    return True
+
+
+def update_catalog(episode_dir):
+    """복구한 에피소드를 catalog에 saved로 요약과 함께 기록 (catalog가 있고 recording 상태일 때만)"""
+    base_path, name = os.path.split(os.path.normpath(episode_dir))
+    suffix = name[len(EPISODE_PREFIX):]
+    if not name.startswith(EPISODE_PREFIX) or not suffix.isdigit() \
+            or not os.path.exists(os.path.join(base_path, CATALOG_NAME)):
+        return False
+    with EpisodeCatalog(base_path) as catalog:
+        episode = catalog.get(int(suffix))
+        if episode is None or episode["status"] != "recording":
+            return False
+        tactile = TactileFile(os.path.join(episode_dir, "tactile.bin"))
+        summary = {"frames": len(tactile), "tactile_samples": len(tactile.rx_ns), "bytes": directory_bytes(episode_dir)}
+        if len(tactile) > 1:
+            summary["duration"] = float(tactile.frame_time[-1] - tactile.frame_time[0])
+        metadata_path = os.path.join(episode_dir, "metadata.json")
+        if os.path.exists(metadata_path):
+            with open(metadata_path, "r") as f:
+                summary["fps"] = json.load(f).get("fps")
+        catalog.update(int(suffix), status="saved", **summary)
+    return True
+
+
+def export_json(path, json_path):
+    with open(json_path, "w") as f:
+        json.dump(TactileFile(path).to_json_list(), f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert between tactile.json and the binary tactile.bin format.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    convert_parser = subparsers.add_parser('convert', help='Write tactile.bin next to every epi_XXXXXX/tactile.json')
+    convert_parser.add_argument('dataset', type=str, help='Dataset directory holding epi_XXXXXX folders')
+    convert_parser.add_argument('--overwrite', action='store_true', help='Replace an existing tactile.bin')
+    recover_parser = subparsers.add_parser('recover', help='Build tactile.bin for episodes whose recording was interrupted')
+    recover_parser.add_argument('dataset', type=str, help='Dataset directory holding epi_XXXXXX folders')
+    recover_parser.add_argument('--no_checkpoint', action='store_true',
+                                help='Keep every complete record, also those written after the last checkpoint')
+    export_parser = subparsers.add_parser('export', help='Write tactile.json from a tactile.bin')
+    export_parser.add_argument('path', type=str, help='tactile.bin')
+    export_parser.add_argument('--out', type=str, default=None, help='Output path (default: tactile.json next to it)')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        for json_path in sorted(glob.glob(os.path.join(args.dataset, "epi_*", "tactile.json"))):
+            path = os.path.join(os.path.dirname(json_path), "tactile.bin")
+            if os.path.exists(path) and not args.overwrite:
+                continue
+            convert_json(json_path, path)
+            print(f"{json_path} -> {path}")
+    elif args.command == 'recover':
+        for episode_dir in sorted(glob.glob(os.path.join(args.dataset, "epi_*"))):
+            if recover_episode(episode_dir, not args.no_checkpoint):
+                print(f"recovered {episode_dir}")
+    else:
+        json_path = args.out or os.path.join(os.path.dirname(args.path), "tactile.json")
+        export_json(args.path, json_path)
+        print(f"{args.path} -> {json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import struct
+import threading
+from queue import Queue, Empty, Full
+
+import numpy as np
+
+# tactile_stream.bin: 모든 sensor bypass 패킷을 수신 순서대로 기록하는 append-only 로그
+#
+#   magic "TLOG" | version u16 | header_len u32 | JSON header (8바이트 정렬) | records...
+#
+# header에는 start_ns, 센서 id, 보정값(baseline)이 들어가고, record는 RECORD_DTYPE 고정 크기.
+# values는 보정 전 원본 값(x2 스케일 적용)이며 보정은 읽을 때 baseline을 빼서 적용한다.
+#
+# tactile_stream.frames: 카메라 프레임마다 (frame_time, 센서별 최신 record 위치) 한 줄씩
+# tactile_stream.ckpt  : fsync까지 끝난 record/frame 수. 녹화 중 죽어도 이 지점까지는 복구 가능
+
+LOG_MAGIC = b"TLOG"
+LOG_VERSION = 1
+LOG_PREFIX = struct.Struct("<4sHI")
+
+RECORD_DTYPE = np.dtype([
+    ("rx_ns", "<i8"),
+    ("port", "u1"),
+    ("id", "u1"),
+    ("values", "<i2", (16, 3)),
+])
+
+SENSOR_IDS = tuple(range(128, 140))
+
+
+def frame_dtype(sensor_count):
+    return np.dtype([("frame_time", "<f8"), ("index", "<i8", (sensor_count,))])
+
+
+def frames_path(path):
+    return os.path.splitext(path)[0] + ".frames"
+
+
+def checkpoint_path(path):
+    return os.path.splitext(path)[0] + ".ckpt"
+
+
+def baseline_array(init_tactile_table, sensor_ids=SENSOR_IDS):
+    """{sensor_id: [16][3]} 보정 테이블을 (len(sensor_ids), 16, 3) 배열로 변환"""
+    baseline = np.zeros((len(sensor_ids), 16, 3), dtype=np.int16)
+    for sensor_id, data in (init_tactile_table or {}).items():
+        if int(sensor_id) in sensor_ids:
+            baseline[sensor_ids.index(int(sensor_id))] = data
+    return baseline
+
+
+class TactileStreamLog:
+    """Append-only log of every sensor bypass packet of one episode, written by a background thread.
+
+    append() and add_frame() only queue their data. The writer thread writes
+    records and frames as they come, keeps the latest record position of every
+    sensor for the frame index, and every checkpoint_interval seconds fsyncs
+    both files and records how far they are valid. Memory use does not grow
+    with the episode length; at most max_pending batches wait in the queue.
+
+    If writing fails (e.g. the disk is full) the writer thread stops and keeps
+    the exception in `error`. append() and add_frame() then raise instead of
+    waiting for a queue nobody drains, and close() raises the error. A put
+    that cannot get into a full queue within put_timeout seconds raises too.
+    """
+
+    def __init__(self, path, start_ns, init_tactile_table=None, ports=(), sensor_ids=SENSOR_IDS,
+                 checkpoint_interval=1.0, max_pending=1024, put_timeout=1.0):
+        self.path = path
+        self.frames_path = frames_path(path)
+        self.checkpoint_path = checkpoint_path(path)
+        self.sensor_ids = tuple(sensor_ids)
+        self.checkpoint_interval = checkpoint_interval
+        self.put_timeout = put_timeout
+        self.error = None
+        self.count = 0            # record 수 (queue에 넣은 기준)
+        self.frame_count = 0
+        self.written_count = 0    # writer thread가 파일에 쓴 record 수
+        self.written_frames = 0
+        self.checkpoint_count = 0
+        self.closed = False
+
+        self.row = np.full(256, -1, dtype=np.int64)
+        self.row[list(self.sensor_ids)] = np.arange(len(self.sensor_ids))
+        self.last_index = np.full(len(self.sensor_ids), -1, dtype=np.int64)
+        self.frame_dtype = frame_dtype(len(self.sensor_ids))
+
+        header = {
+            "start_ns": start_ns,
+            "sensor_ids": list(self.sensor_ids),
+            "ports": list(ports),
+            "baseline": baseline_array(init_tactile_table, self.sensor_ids).tolist(),
+            "record_size": RECORD_DTYPE.itemsize,
+        }
+        header_bytes = json.dumps(header).encode("utf-8")
+        header_bytes += b" " * (-(LOG_PREFIX.size + len(header_bytes)) % 8)
+        self.f = open(path, "wb")
+        self.f.write(LOG_PREFIX.pack(LOG_MAGIC, LOG_VERSION, len(header_bytes)))
+        self.f.write(header_bytes)
+        self.frames_f = open(self.frames_path, "wb")
+        self._checkpoint()
+
+        self.lock = threading.Lock()
+        self.queue = Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._writer)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def append(self, ports, ids, rx_ns, values):
+        """decodeSensorBypassBatch()/RobotHub.drainSensorBypassBatch() 결과를 그대로 기록"""
+        records = np.empty(len(ids), dtype=RECORD_DTYPE)
+        records["rx_ns"] = rx_ns
+        records["port"] = ports
+        records["id"] = ids
+        records["values"] = values
+        with self.lock:
+            if self.closed:
+                return self.count
+            self._put(records)
+            self.count += len(records)
+            return self.count
+
+    def add_frame(self, frame_time):
+        """지금까지 append된 패킷 기준으로 센서별 최신 record 위치를 프레임으로 기록"""
+        with self.lock:
+            if self.closed:
+                return self.frame_count
+            self._put(float(frame_time))
+            self.frame_count += 1
+            return self.frame_count
+
+    def _put(self, item):
+        if self.error is not None or not self.thread.is_alive():
+            raise RuntimeError(f"Tactile log writer stopped: {self.error}")
+        try:
+            self.queue.put(item, timeout=self.put_timeout)
+        except Full:
+            raise RuntimeError(f"Tactile log writer is not keeping up ({self.queue.maxsize} batches pending)")
+
+    def _writer(self):
+        try:
+            self._write_loop()
+        except Exception as e:
+            self.error = e
+            print("Tactile log writer encountered error:", e)
+
+    def _write_loop(self):
+        next_checkpoint = time.monotonic() + self.checkpoint_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=self.checkpoint_interval)
+            except Empty:
+                item = False
+            if item is None:
+                break
+            if isinstance(item, np.ndarray):
+                self._write_records(item)
+            elif item is not False:
+                frame = np.zeros(1, dtype=self.frame_dtype)
+                frame["frame_time"] = item
+                frame["index"] = self.last_index
+                self.frames_f.write(frame.tobytes())
+                self.written_frames += 1
+            if time.monotonic() >= next_checkpoint:
+                self._checkpoint()
+                next_checkpoint = time.monotonic() + self.checkpoint_interval
+        self._checkpoint()
+
+    def _write_records(self, records):
+        self.f.write(records.tobytes())
+        rows = self.row[records["id"]]
+        known = np.flatnonzero(rows >= 0)
+        if len(known):
+            # 센서별 마지막 위치
+            rows, last = np.unique(rows[known][::-1], return_index=True)
+            self.last_index[rows] = self.written_count + known[len(known) - 1 - last]
+        self.written_count += len(records)
+
+    def _checkpoint(self):
+        for f in (self.f, self.frames_f):
+            f.flush()
+            os.fsync(f.fileno())
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"records": self.written_count, "frames": self.written_frames}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+        self.checkpoint_count += 1
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            # writer가 도중에 죽어도 막히지 않도록 짧게 나눠서 put
+            while self.thread.is_alive():
+                try:
+                    self.queue.put(None, timeout=0.1)
+                    break
+                except Full:
+                    pass
+        self.thread.join()
+        self.f.close()
+        self.frames_f.close()
+        if self.error is not None:
+            raise self.error
+
+
+def read_tactile_log(path, use_checkpoint=True):
+    """(header dict, records memmap, frames)을 반환.
+
+    use_checkpoint이면 마지막 checkpoint까지만, 아니면 파일에 있는 완전한 record를 모두 읽는다.
+    """
+    with open(path, "rb") as f:
+        magic, version, header_len = LOG_PREFIX.unpack(f.read(LOG_PREFIX.size))
+        if magic != LOG_MAGIC:
+            raise ValueError(f"{path} is not a tactile stream log")
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        offset = f.tell()
+        f.seek(0, 2)
+        count = (f.tell() - offset) // RECORD_DTYPE.itemsize
+
+    dtype = frame_dtype(len(header["sensor_ids"]))
+    frame_count = 0
+    if os.path.exists(frames_path(path)):
+        frame_count = os.path.getsize(frames_path(path)) // dtype.itemsize
+    if use_checkpoint and os.path.exists(checkpoint_path(path)):
+        with open(checkpoint_path(path), "r") as f:
+            checkpoint = json.load(f)
+        count = min(count, checkpoint["records"])
+        frame_count = min(frame_count, checkpoint["frames"])
+
+    records = np.zeros(0, dtype=RECORD_DTYPE)
+    if count > 0:
+        records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=offset, shape=(count,))
+    frames = np.zeros(0, dtype=dtype)
+    if frame_count > 0:
+        frames = np.memmap(frames_path(path), dtype=dtype, mode="r", shape=(frame_count,))
+    return header, records, frames
+
+
+def remove_tactile_log(path):
+    for remove_path in (path, frames_path(path), checkpoint_path(path)):
+        if os.path.exists(remove_path):
+            os.remove(remove_path)
@@ -0,0 +1,179 @@
+import threading
+
+import numpy as np
+
+from hday import RobotHub, TactileState, TACTILE_SENSOR_IDS
+
+
+class TactileSession:
+    """Tactile controllers kept open and enabled for a whole collection run.
+
+    One reader thread drains the RobotHub and keeps `state` (a TactileState)
+    current. Validation reads that state; recording attaches a sink (anything
+    with append(ports, ids, rx_ns, values), e.g. a TactileStreamLog) that gets
+    every batch while it is attached. Ports are opened and enabled once in
+    open() instead of once per validation and once per recording.
+    ensure_open() reopens every port when one of them was lost, e.g. after a
+    replug, or has not sent a sensor packet for stale_after seconds.
+    """
+
+    def __init__(self, tactile_port, stale_after=1.0):
+        self.tactile_port = tactile_port
+        self.stale_after = stale_after
+        self.hub = None
+        self.state = TactileState()
+        self.sinks = ()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.error = None
+        self.baseline = None  # (len(sensor_ids), 16, 3) int16, kept across episodes
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def is_open(self):
+        return (self.thread is not None and self.thread.is_alive()
+                and self.hub is not None and self.hub.isAlive(self.stale_after))
+
+    def open(self):
+        # tactile_port may list several controllers separated by commas, all read by one thread.
+        self.hub = RobotHub(self.tactile_port).open()
+        self.hub.enable(True)
+        self.error = None
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._reader)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def ensure_open(self):
+        if not self.is_open:
+            self.close()
+            self.open()
+        return self
+
+    def close(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.hub is not None:
+            self.hub.close()
+            self.hub = None
+
+    def attach(self, sink):
+        with self.lock:
+            self.sinks = self.sinks + (sink,)
+
+    def detach(self, sink):
+        with self.lock:
+            self.sinks = tuple(s for s in self.sinks if s is not sink)
+
+    def _reader(self):
+        try:
+            while not self.stop_event.is_set():
+                ports, ids, rx_ns, values = self.hub.drainSensorBypassBatch(timeout=0.1)
+                if len(ids):
+                    for sink in self.sinks:
+                        try:
+                            sink.append(ports, ids, rx_ns, values)
+                        except Exception as e:
+                            # Detach only the failing sink and keep reading the sensors
+                            print("Tactile sink encountered error:", e)
+                            self.detach(sink)
+                    # Only sensor ids 128~139 are kept, the latest packet of every sensor wins
+                    self.state.update(ids, rx_ns, values)
+        except Exception as e:
+            self.error = e
+            print("Tactile thread encountered error:", e)
+
+    def update_baseline(self, mean, drift_threshold):
+        """Update the baseline from the mean of every sensor.
+
+        Only sensors that differ from the cached baseline by drift_threshold or
+        more are taken again. Returns (baseline, ids of the sensors taken again).
+        """
+        mean = np.rint(mean).astype(np.int16)
+        if self.baseline is None:
+            drifted = np.ones(len(mean), dtype=bool)
+            self.baseline = mean
+        else:
+            drifted = np.abs(mean.astype(np.int32) - self.baseline).max(axis=(1, 2)) >= drift_threshold
+            self.baseline = np.where(drifted[:, None, None], mean, self.baseline)
+        return self.baseline, self.state.sensor_ids[drifted].tolist()
+
+    def get_stats(self):
+        """Serial link statistics of every open port since reset_stats(), see RobotHub.getStats()."""
+        return self.hub.getStats() if self.hub is not None else None
+
+    def reset_stats(self):
+        if self.hub is not None:
+            self.hub.resetStats()
+
+    def report_health(self):
+        """Print ports that could not be opened and sensor packets lost since reset_stats().
+
+        Packets are lost when the framer drops them (checksum or length errors)
+        or when a port's sensor ring or the merged hub ring overflows.
+        """
+        if self.hub is None:
+            return
+        health = self.hub.getHealth()
+        for port in self.hub.ports:
+            port_health = health[port]
+            if not port_health["open"]:
+                print(f"Tactile port could not be opened: {port}")
+                continue
+            overflow = port_health["counters"]["overflow"] if port_health["counters"] else 0
+            if port_health["checksum_errors"] or port_health["length_errors"] or overflow:
+                print(f"Tactile packets lost on {port}: {port_health['checksum_errors']} checksum errors, "
+                      f"{port_health['length_errors']} length errors, {port_health['resyncs']} resyncs, "
+                      f"{overflow} overflowed")
+        if health["merged_overflow"]:
+            print(f"Tactile packets lost: {health['merged_overflow']} overflowed in the merged ring")
+
+
+class BaselineEstimator:
+    """Sink that keeps the last `samples` raw packets of every sensor.
+
+    Attach it to a TactileSession while validating. A sensor has converged
+    once it has a full window and the standard deviation of every taxel and
+    axis in that window is at most max_std, i.e. the sensor is not being
+    touched or still settling.
+    """
+
+    def __init__(self, sensor_ids=TACTILE_SENSOR_IDS, samples=20, max_std=3.0):
+        self.sensor_ids = np.array(sensor_ids, dtype=np.int64)
+        self.samples = samples
+        self.max_std = max_std
+        self.row = np.full(256, -1, dtype=np.int64)
+        self.row[self.sensor_ids] = np.arange(len(self.sensor_ids))
+        self.window = np.zeros((len(self.sensor_ids), samples, 16, 3), dtype=np.int16)
+        self.count = np.zeros(len(self.sensor_ids), dtype=np.int64)
+        self.lock = threading.Lock()
+
+    def append(self, ports, ids, rx_ns, values):
+        rows = self.row[ids]
+        with self.lock:
+            for row in np.unique(rows[rows >= 0]):
+                batch = values[rows == row][-self.samples:]
+                slots = (self.count[row] + np.arange(len(batch))) % self.samples
+                self.window[row, slots] = batch
+                self.count[row] += len(batch)
+
+    def estimate(self):
+        """(mean per sensor (S, 16, 3), largest standard deviation per sensor (S,), full window mask (S,))"""
+        with self.lock:
+            window = self.window.astype(np.float64)
+            ready = self.count >= self.samples
+        return window.mean(axis=1), window.std(axis=1).max(axis=(1, 2)), ready
+
+    def converged(self):
+        _, std, ready = self.estimate()
+        return ready & (std <= self.max_std)
@@ -1,5 +1,8 @@
+from .ring import *
 from .cmd import *
 from .cmd_boot import *
 from .cmd_hand import *
 
 from .robot import *
+from .hub import *
+from .state import *
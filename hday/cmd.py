@@ -1,17 +1,24 @@
 import time
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
 import serial
-import copy
 import serial.tools.list_ports as sp
 
-# from PySide6.QtCore import QThread, QObject, Signal, QMutex
-from PySide6.QtCore import QThread, QObject, QMutex
 from hday.err_code import *
-from queue import Queue
+from hday.ring import PacketRing
+from hday.stats import CmdStats
 
 
 CMD_STX0 = 0x02
 CMD_STX1 = 0xFD
 
+CMD_HEADER_LEN    = 9     # stx0, stx1, type, cmd(2), err_code(2), length(2)
+CMD_MAX_DATA_LEN  = 4096
+CMD_READ_CHUNK    = 4096
+CMD_RESP_GRACE_S  = 0.25    # how long after sending a timed-out request still owns the next response to its cmd
+
 
 
 
@@ -23,6 +30,21 @@ CMD_STX1 = 0xFD
 def millis():
   return round(time.time() * 1000)
 
+def buildHeader(type, cmd, err_code, length):
+  return bytes((CMD_STX0, CMD_STX1, type & 0xFF,
+                cmd & 0xFF, (cmd >> 8) & 0xFF,
+                err_code & 0xFF, (err_code >> 8) & 0xFF,
+                length & 0xFF, (length >> 8) & 0xFF))
+
+def buildPacket(type, cmd, err_code, data=None):
+  """Encode one packet: header, payload and checksum."""
+  length = len(data) if data is not None else 0
+  buffer = bytearray(buildHeader(type, cmd, err_code, length))
+  if length > 0:
+    buffer += data
+  buffer.append((-sum(buffer)) & 0xFF)
+  return buffer
+
 class CmdPacket:
 
   PKT_TYPE_CMD    = 0x00
@@ -35,64 +57,343 @@ class CmdPacket:
   PKT_TYPE_STATUS = 0x07
   PKT_TYPE_CTRL   = 0x08
 
-  def __init__(self):
-    super().__init__()
-    self.type = 0
-    self.cmd = 0
-    self.err_code = 0
+  __slots__ = ("type", "cmd", "err_code", "check_sum", "check_sum_recv",
+               "index", "length", "seq", "rx_ns", "data")
+
+  def __init__(self, type=0, cmd=0, err_code=0, data=b""):
+    self.type = type
+    self.cmd = cmd
+    self.err_code = err_code
     self.check_sum = 0
     self.check_sum_recv = 0
     self.index = 0
-    self.data = bytearray(4096)
+    self.length = len(data)
+    self.seq = 0
+    self.rx_ns = 0            # time.monotonic_ns() when the checksum was validated
+    # Received packets carry a read-only payload of exactly `length` bytes, so they
+    # can be shared between the reader thread and consumers without copying.
+    self.data = data
+
+
+class CmdFramer:
+  """Packet framer working on whole chunks instead of single bytes.
+
+  Received bytes are appended to one reusable buffer, STX0/STX1 are located
+  with buffer searches and header, length and checksum are checked for a whole
+  packet at once. Every valid packet is handed to on_packet as a new CmdPacket
+  holding only its own payload. err_code keeps the error of the last rejected
+  packet, like CmdThread.parsingPacket does on its working packet.
+  """
+
+  def __init__(self, on_packet, max_length=CMD_MAX_DATA_LEN):
+    self.on_packet = on_packet
+    self.max_length = max_length
+    self.err_code = OK
+    self.buf = bytearray()
+    self.resetCounters()
+
+  def reset(self):
+    del self.buf[:]
+
+  def resetCounters(self):
+    self.rx_bytes = 0
+    self.packet_count = 0
+    self.checksum_fail_count = 0
+    self.length_fail_count = 0
+    self.resync_count = 0         # times bytes had to be thrown away to find the next packet
+    self.discard_bytes = 0
+
+  def feed(self, rx_bytes):
+    buf = self.buf
+    buf += rx_bytes
+    self.rx_bytes += len(rx_bytes)
+    end = len(buf)
+    pos = 0
+    stx0 = bytes([CMD_STX0])
+
+    while True:
+      start = buf.find(stx0, pos)
+      if start < 0:
+        start = end
+      if start > pos:
+        self.resync_count += 1
+        self.discard_bytes += start - pos
+        pos = start
+      if start + 1 >= end:
+        break
+      if buf[start + 1] != CMD_STX1:
+        # Same as the state machine: the byte after a lone STX0 is consumed.
+        self.resync_count += 1
+        self.discard_bytes += 2
+        pos = start + 2
+        continue
+      if start + CMD_HEADER_LEN > end:
+        break
 
+      length = buf[start + 7] | (buf[start + 8] << 8)
+      if length > self.max_length:
+        self.err_code = ERR_CMD_MAX_LENGTH
+        self.length_fail_count += 1
+        self.resync_count += 1
+        self.discard_bytes += CMD_HEADER_LEN
+        pos = start + CMD_HEADER_LEN
+        continue
+
+      data_end = start + CMD_HEADER_LEN + length
+      if data_end >= end:
+        break
 
-class CmdThread(QThread):
-#   event_sig = Signal(CmdPacket)
+      check_sum = (-sum(memoryview(buf)[start:data_end])) & 0xFF
+      check_sum_recv = buf[data_end]
+      pos = data_end + 1
+
+      if check_sum != check_sum_recv:
+        self.err_code = ERR_CMD_CHECKSUM
+        self.checksum_fail_count += 1
+        self.resync_count += 1
+        self.discard_bytes += pos - start
+        continue
+
+      rx_ns = time.monotonic_ns()
+      self.packet_count += 1
+      packet = CmdPacket(buf[start + 2],
+                         buf[start + 3] | (buf[start + 4] << 8),
+                         buf[start + 5] | (buf[start + 6] << 8),
+                         bytes(buf[start + CMD_HEADER_LEN:data_end]))
+      packet.index = length
+      packet.check_sum = check_sum
+      packet.check_sum_recv = check_sum_recv
+      packet.rx_ns = rx_ns
+      try:
+        self.on_packet(packet)
+      except Exception as e:
+        print(e)
 
-  def __init__(self, port, resp_q):
-    super().__init__()
-    self.working = True
-    self.request_exit = False
+    del buf[:pos]
+
+
+def callInLoop(loop, func, *args):
+  """Run func on the loop's own thread and return its result."""
+  try:
+    running = asyncio.get_running_loop()
+  except RuntimeError:
+    running = None
+  if running is loop or not loop.is_running():
+    return func(*args)
+
+  done = concurrent.futures.Future()
+  def call():
+    try:
+      done.set_result(func(*args))
+    except Exception as e:
+      done.set_exception(e)
+  loop.call_soon_threadsafe(call)
+  return done.result()
+
+
+class CmdSubscription:
+  """Packets of one type and command id, as they arrive.
+
+  type / cmd of None match anything. Without a callback matching packets are
+  queued in a PacketRing and picked up with wait_for_packet() or
+  drain_packets(). A callback is called from the reading thread (or loop)
+  instead and must return quickly.
+  """
+
+  def __init__(self, receiver, type=None, cmd=None, callback=None, ring_size=4096):
+    self.receiver = receiver
+    self.type = type
+    self.cmd = cmd
+    self.callback = callback
+    self.ring = PacketRing(ring_size)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def matches(self, packet):
+    return (self.type is None or packet.type == self.type) and (self.cmd is None or packet.cmd == self.cmd)
+
+  def deliver(self, packet):
+    if self.callback is None:
+      self.ring.put(packet)
+      return
+    try:
+      self.callback(packet)
+    except Exception as e:
+      print(e)
+
+  def wait_for_packet(self, timeout=None):
+    """Oldest pending packet, waiting up to timeout seconds. None on timeout."""
+    return self.ring.get(timeout)
+
+  def drain_packets(self, timeout=0, max_count=None):
+    """All pending packets. With a timeout, first wait until there is at least one."""
+    return self.ring.drain(max_count, timeout)
+
+  def close(self):
+    self.receiver.unsubscribe(self)
+
+
+class CmdReceiver:
+  """Receive side of a Cmd: framing, response matching and the packet ring.
+
+  Responses are matched to outstanding requests by command id. Requests with
+  the same id are answered in the order they were sent. A request that timed
+  out keeps its place, so its late response is dropped instead of answering
+  the next request. The place is given up (the request counts as expired)
+  resp_grace seconds after the request was sent, or as soon as a later
+  request with the same id gets a response that fits that request better,
+  i.e. its time since sending is closer to the fastest round trip seen so
+  far. Keep resp_grace below the request timeouts, so a lost response never
+  holds the place into the next request.
+
+  How the port is read is up to the subclass: CmdThread blocks on it in its
+  own thread, CmdAsyncReader is driven by an asyncio loop.
+  """
+
+  def __init__(self, port, ring_size=4096, resp_grace=CMD_RESP_GRACE_S):
     self.port = port
+    self.resp_grace_ns = int(resp_grace * 1e9)
     self.packet_state = 0
-    self.packet = CmdPacket()
+    self.packet = CmdPacket(data=bytearray(CMD_MAX_DATA_LEN))
+    self.framer = CmdFramer(self._dispatchPacket)
+    self.stats = CmdStats(self.framer)
 
-    self.resp_q = resp_q
-    self.mutex = QMutex()
+    self.pending = {}         # cmd -> deque of Futures waiting for its response
+    self.mutex = threading.Lock()
 
     self.rxd_packet = None
-
-  def __del__(self):
+    self.rxd_ring = PacketRing(ring_size)
+    self.keep_ring = True     # False when every packet is read through subscriptions
+    self.rx_seq = 0
+    self.drop_count = 0
+    self.late_count = 0       # responses that arrived after their request timed out
+    self.expired_count = 0    # timed-out requests whose response never came
+    self.min_rtt_ns = None    # fastest round trip of an answered request
+    self.subscriptions = ()
+
+  def attach(self):
     pass
 
-  def run(self):
-    while self.working:
-      try:
-        data =  self.port.read()
-        self.parsingPacket(data)
-      except Exception as e:
-        time.sleep(0.001)
-      if self.request_exit == True:
-        self.working = False
-
-#   def setRxdSignal(self, receive_func):
-#     self.event_sig.connect(receive_func)
+  def detach(self):
+    pass
 
   def stop(self):
-    self.request_exit = True
-    self.quit()
-    while True:
-      self.sleep(0.1)
-      if self.working == False:
-        break
+    pass
+
+  def readPort(self):
+    rx_len = min(max(self.port.in_waiting, 1), CMD_READ_CHUNK)
+    data = self.port.read(rx_len)
+    start_ns = time.perf_counter_ns()
+    self.framer.feed(data)
+    self.stats.onChunk(len(data), time.perf_counter_ns() - start_ns)
 
   def getPacket(self):
     self.is_rxd_packet = False
     return self.rxd_packet
 
+  def drain_packets(self, max_count=None, timeout=0):
+    return self.rxd_ring.drain(max_count, timeout)
+
+  def wait_for_packet(self, timeout=None):
+    return self.rxd_ring.get(timeout)
+
+  def subscribe(self, type=None, cmd=None, callback=None, ring_size=4096):
+    sub = CmdSubscription(self, type, cmd, callback, ring_size)
+    with self.mutex:
+      self.subscriptions = self.subscriptions + (sub,)
+    return sub
+
+  def unsubscribe(self, sub):
+    with self.mutex:
+      self.subscriptions = tuple(s for s in self.subscriptions if s is not sub)
+
+  def getRxCounters(self):
+    return {
+      "received": self.rx_seq,
+      "overflow": self.rxd_ring.overflow_count,
+      "dropped": self.drop_count,
+      "late": self.late_count,
+      "expired": self.expired_count,
+    }
+
+  def resetRxCounters(self):
+    self.rx_seq = 0
+    self.rxd_ring.overflow_count = 0
+    self.drop_count = 0
+    self.late_count = 0
+    self.expired_count = 0
+
+  def addPending(self, cmd):
+    future = concurrent.futures.Future()
+    future.sent_ns = time.monotonic_ns()
+    with self.mutex:
+      self.pending.setdefault(cmd, deque()).append(future)
+    return future
+
+  def removePending(self, cmd, future):
+    """Forget a request that was never sent, so no response is expected for it."""
+    with self.mutex:
+      futures = self.pending.get(cmd)
+      if futures and future in futures:
+        futures.remove(future)
+    future.cancel()
+
+  def _fitsSuccessor(self, head, successor, now_ns):
+    # Without a measured round trip the response goes to the request still waiting for it.
+    if self.min_rtt_ns is None:
+      return True
+    return abs(now_ns - successor.sent_ns - self.min_rtt_ns) <= abs(now_ns - head.sent_ns - self.min_rtt_ns)
+
   def clearBuffer(self):
-    if self.resp_q.qsize() > 0:
-      self.resp_q.get()
+    with self.mutex:
+      pending = self.pending
+      self.pending = {}
+    for futures in pending.values():
+      for future in futures:
+        future.cancel()
+
+  def _dispatchPacket(self, packet):
+    self.stats.onPacket(packet, packet.rx_ns)
+    if packet.type == CmdPacket.PKT_TYPE_RESP:
+      now_ns = time.monotonic_ns()
+      with self.mutex:
+        futures = self.pending.get(packet.cmd)
+        future = None
+        # Timed-out requests are given up after resp_grace or once a later request can own the response.
+        while futures and futures[0].cancelled():
+          successor = next((f for f in futures if not f.cancelled()), None)
+          if (now_ns - futures[0].sent_ns <= self.resp_grace_ns
+              and (successor is None or not self._fitsSuccessor(futures[0], successor, now_ns))):
+            break
+          futures.popleft()
+          self.expired_count += 1
+        if futures:
+          future = futures.popleft()
+      if future is None:
+        # Nobody is waiting for it.
+        self.drop_count += 1
+      elif future.set_running_or_notify_cancel():
+        rtt_ns = now_ns - future.sent_ns
+        if self.min_rtt_ns is None or rtt_ns < self.min_rtt_ns:
+          self.min_rtt_ns = rtt_ns
+        future.set_result(packet)
+      else:
+        # Late response of a request that timed out, it must not answer the next one.
+        self.late_count += 1
+    else:
+      packet.seq = self.rx_seq
+      self.rx_seq += 1
+      if self.keep_ring:
+        self.rxd_ring.put(packet)
+      with self.mutex:
+        self.rxd_packet = packet  # Store packet
+      for sub in self.subscriptions:
+        if sub.matches(packet):
+          sub.deliver(packet)
 
   def parsingPacket(self, rx_bytes):
     CMD_STATE_WAIT_STX0      = 0
@@ -175,14 +476,13 @@ class CmdThread(QThread):
 
           if self.packet.check_sum == self.packet.check_sum_recv:
             try:
-              if self.packet.type == CmdPacket.PKT_TYPE_RESP:
-                self.resp_q.put(self.packet, 1)
-              else:
-                self.mutex.lock()
-                # packet = copy.deepcopy(self.packet)
-                self.rxd_packet = copy.deepcopy(self.packet)  # Store packet
-                self.mutex.unlock()
-                # self.event_sig.emit(packet)
+              packet = CmdPacket(self.packet.type, self.packet.cmd, self.packet.err_code,
+                                 bytes(self.packet.data[:self.packet.length]))
+              packet.index = self.packet.index
+              packet.check_sum = self.packet.check_sum
+              packet.check_sum_recv = self.packet.check_sum_recv
+              packet.rx_ns = time.monotonic_ns()
+              self._dispatchPacket(packet)
             except Exception as e:
               print(e)
 
@@ -194,22 +494,109 @@ class CmdThread(QThread):
       print(e)
 
 
+class CmdThread(CmdReceiver, threading.Thread):
+  """Reads the port in a dedicated thread."""
+
+  def __init__(self, port, ring_size=4096):
+    CmdReceiver.__init__(self, port, ring_size)
+    threading.Thread.__init__(self, daemon=True)
+    self.working = True
+    self.request_exit = False
+
+  def run(self):
+    while self.working:
+      try:
+        self.readPort()
+      except Exception as e:
+        time.sleep(0.001)
+      if self.request_exit == True:
+        self.working = False
+
+  def stop(self):
+    self.request_exit = True
+    if self.is_alive() and threading.current_thread() is not self:
+      self.join()
+
+
+class CmdAsyncReader(CmdReceiver):
+  """Reads the port from an asyncio loop whenever its file descriptor is readable."""
+
+  def __init__(self, port, loop, ring_size=4096):
+    super().__init__(port, ring_size)
+    self.loop = loop
+    self.fd = None
+
+  def attach(self):
+    self.detach()
+    self.fd = self.port.fileno()
+    callInLoop(self.loop, self.loop.add_reader, self.fd, self._onReadable)
+
+  def detach(self):
+    if self.fd is not None:
+      callInLoop(self.loop, self.loop.remove_reader, self.fd)
+      self.fd = None
+
+  def stop(self):
+    self.detach()
+
+  def _onReadable(self):
+    try:
+      self.readPort()
+    except Exception as e:
+      print(e)
+      self.loop.remove_reader(self.fd)
+      self.fd = None
 
-class Cmd(QObject):
-#   rxd_sig = Signal(CmdPacket)
+
+class CmdEventLoop:
+  """An asyncio loop running in one background thread, to be shared by several Cmd instances."""
 
   def __init__(self):
-    super().__init__()
+    self.loop = asyncio.new_event_loop()
+    self.thread = threading.Thread(target=self._run, daemon=True)
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.stop()
+
+  def _run(self):
+    asyncio.set_event_loop(self.loop)
+    self.loop.run_forever()
+
+  def start(self):
+    self.thread.start()
+    return self.loop
+
+  def stop(self):
+    if self.thread.is_alive():
+      self.loop.call_soon_threadsafe(self.loop.stop)
+      self.thread.join()
+    self.loop.close()
+
+
+class Cmd:
+  """Serial command channel.
+
+  Without a loop the port is read by a CmdThread. With an asyncio loop (for
+  example CmdEventLoop().start()) reads are driven by that loop, so several
+  Cmd instances can share one thread. The blocking calls then have to be made
+  from other threads; code running on the loop uses sendCmdRxRespAsync().
+  """
+
+  def __init__(self, loop=None):
     self.is_init = False
     self.is_open = False
-    self.resp_q = Queue(1)
-    self.mutex = QMutex()
-    self.mutex_send = QMutex()
+    self.mutex_send = threading.Lock()
 
+    self.loop = loop
     self.uart_port = serial.Serial(timeout=0.1)
-    self.rxd_thread = CmdThread(self.uart_port, self.resp_q)
-    self.rxd_thread.start()
-    # self.rxd_thread.setRxdSignal(self.eventSignal)
+    if loop is None:
+      self.rxd_thread = CmdThread(self.uart_port)
+      self.rxd_thread.start()
+    else:
+      self.rxd_thread = CmdAsyncReader(self.uart_port, loop)
 
   def __del__(self):
     self.uart_port.close()
@@ -230,6 +617,7 @@ class Cmd(QObject):
       self.uart_port.flush()
       self.uart_port.flushInput()
       self.uart_port.flushOutput()
+      self.rxd_thread.attach()
       self.is_open = True
       # self.uart_port.timeout = 0.1
       print('Uart::open() OK')
@@ -249,6 +637,7 @@ class Cmd(QObject):
       if self.uart_port.is_open == True:
         self.is_open = False
         try:
+          self.rxd_thread.detach()
           self.uart_port.cancel_read()
           self.uart_port.cancel_write()
           self.uart_port.close()
@@ -257,55 +646,75 @@ class Cmd(QObject):
           pass
 
   def send(self, type, cmd, err_code, data, length):
-    index = 0
-    buffer = bytearray(10 + length)
-    buffer[0] = CMD_STX0
-    buffer[1] = CMD_STX1
-    buffer[2] = type & 0xFF
-    buffer[3] = (cmd >> 0) & 0xFF
-    buffer[4] = (cmd >> 8) & 0xFF
-    buffer[5] = (err_code >> 0) & 0xFF
-    buffer[6] = (err_code >> 8) & 0xFF
-    buffer[7] = (length >> 0) & 0xFF
-    buffer[8] = (length >> 8) & 0xFF
-
-    index = 9
-    for i in range(length):
-      buffer[index+i] = data[i]
-
-    index += length
-
-    check_sum = 0
-    for i in range(index):
-      check_sum += buffer[i]
-
-    check_sum = (~check_sum) + 1
-    buffer[index] = check_sum & 0xFF
-    index += 1
+    if length > 0 and len(data) != length:
+      data = memoryview(data)[:length]
+    self.write(buildPacket(type, cmd, err_code, data if length > 0 else None))
 
+  def write(self, buffer):
+    """Write already encoded packets in one call."""
     self.uart_port.write_timeout = 5
-    self.mutex_send.lock()
-    tx_len = self.uart_port.write(buffer)
-    self.mutex_send.unlock()
+    with self.mutex_send:
+      tx_len = self.uart_port.write(buffer)
+    return tx_len
 
   def sendCmd(self, cmd, data, length):
     self.send(CmdPacket.PKT_TYPE_CMD, cmd, 0, data, length)
 
-  def sendCmdRxResp(self, cmd, data, length, timeout_ms):
-    self.mutex.lock()
-    if self.resp_q.qsize() > 0:
-      self.resp_q.get()
-    self.sendCmd(cmd, data, length)
+  def request(self, cmd, data, length):
+    """Send a command and return a concurrent.futures.Future of its response packet.
+
+    Any number of requests may be in flight; wait on several futures to
+    overlap their round trips.
+    """
+    future = self.rxd_thread.addPending(cmd)
+    try:
+      self.sendCmd(cmd, data, length)
+    except Exception as e:
+      self.rxd_thread.removePending(cmd, future)
+      raise e
+    return future
 
-    ret = False
+  def _checkBlocking(self):
+    if self.loop is not None and self.loop.is_running():
+      try:
+        running = asyncio.get_running_loop()
+      except RuntimeError:
+        running = None
+      if running is self.loop:
+        raise RuntimeError("sendCmdRxResp() would block the reading loop, use sendCmdRxRespAsync()")
 
+  def waitResp(self, future, timeout_ms):
     try:
-      ret_packet = self.resp_q.get(timeout=timeout_ms/1000)
-      ret = True
-    except:
-      ret_packet = None
-    self.mutex.unlock()
-    return ret, ret_packet
+      return True, future.result(timeout=timeout_ms/1000)
+    except concurrent.futures.TimeoutError:
+      future.cancel()
+      return False, None
+    except concurrent.futures.CancelledError:
+      return False, None
+
+  def sendCmdRxResp(self, cmd, data, length, timeout_ms):
+    self._checkBlocking()
+    return self.waitResp(self.request(cmd, data, length), timeout_ms)
+
+  def sendCmdRxRespMany(self, requests, timeout_ms):
+    """Send [(cmd, data, length), ...] back to back and collect [(ret, packet), ...] in order."""
+    self._checkBlocking()
+    futures = [self.request(cmd, data, length) for cmd, data, length in requests]
+    deadline = time.monotonic() + timeout_ms/1000
+    results = []
+    for future in futures:
+      remaining_ms = max(0.0, deadline - time.monotonic()) * 1000
+      results.append(self.waitResp(future, remaining_ms))
+    return results
+
+  async def sendCmdRxRespAsync(self, cmd, data, length, timeout_ms):
+    future = self.request(cmd, data, length)
+    try:
+      ret_packet = await asyncio.wait_for(asyncio.wrap_future(future), timeout_ms/1000)
+      return True, ret_packet
+    except asyncio.TimeoutError:
+      future.cancel()
+      return False, None
 
 
 #   def eventSignal(self, packet: CmdPacket):
@@ -319,6 +728,36 @@ class Cmd(QObject):
     """Get the last parsed packet from CmdThread."""
     return self.rxd_thread.rxd_packet  # Direct access to the last packet
 
+  def drain_packets(self, max_count=None, timeout=0):
+    """Get every packet parsed since the previous call, oldest first."""
+    return self.rxd_thread.drain_packets(max_count, timeout)
+
+  def wait_for_packet(self, timeout=None):
+    """Block until the next packet arrives. None on timeout."""
+    return self.rxd_thread.wait_for_packet(timeout)
+
+  def subscribe(self, type=None, cmd=None, callback=None, ring_size=4096):
+    """Subscribe to packets filtered by type and command id, see CmdSubscription."""
+    return self.rxd_thread.subscribe(type, cmd, callback, ring_size)
+
+  def setRxRing(self, enable):
+    """Keep every packet for drain_packets()/wait_for_packet(). Disable it when only subscriptions read."""
+    self.rxd_thread.keep_ring = enable
+
+  def getRxCounters(self):
+    return self.rxd_thread.getRxCounters()
+
+  def getStats(self):
+    """Receive path statistics (see CmdStats.snapshot) together with the rx counters."""
+    stats = self.rxd_thread.stats.snapshot()
+    stats.update(self.getRxCounters())
+    return stats
+
+  def resetStats(self):
+    """Start the statistics and the rx counters over, e.g. at the start of an episode."""
+    self.rxd_thread.stats.reset()
+    self.rxd_thread.resetRxCounters()
+
   def print(self):
     pre_time = millis()
     time.sleep(0.1)
@@ -108,6 +108,26 @@ class CmdBoot:
       err_code = packet.err_code
     return err_code, None
 
+  def firmWriteRequest(self, addr, data):
+    """Like firmWrite, but returns the Future of the response so several writes can be in flight."""
+    send_buf = pack("II", addr, len(data)) + data
+    return self.cmd.request(self.BOOT_CMD_FW_WRITE, send_buf, len(send_buf))
+
+  def firmRead(self, addr, length, timeout=500):
+    err_code = ERR_CMD_RX_TIMEOUT
+    resp = None
+    send_buf = pack("II", addr, length)
+    ret, packet = self.cmd.sendCmdRxResp(self.BOOT_CMD_FW_READ, send_buf, len(send_buf), timeout)
+    if ret == True:
+      err_code = packet.err_code
+      if err_code == OK:
+        resp = packet.data[:length]
+    return err_code, resp
+
+  def firmReadRequest(self, addr, length):
+    send_buf = pack("II", addr, length)
+    return self.cmd.request(self.BOOT_CMD_FW_READ, send_buf, len(send_buf))
+
   def firmVerify(self, timeout=500):
     err_code = ERR_CMD_RX_TIMEOUT
     ret, packet = self.cmd.sendCmdRxResp(self.BOOT_CMD_FW_VERIFY, None, 0, timeout)
@@ -1,5 +1,6 @@
 import time
 import cmd
+import threading
 from struct import *
 from hday.err_code import *
 from hday.cmd import *
@@ -33,6 +34,10 @@ class CmdHand:
   CMD_MAIN_SEND_POSITION   = 0x020C
   CMD_MAIN_SEND_PING       = 0x020D
 
+  POSITION_FMT = Struct("<Bff")
+  POSITION_HEADER = buildHeader(CmdPacket.PKT_TYPE_CTRL, CMD_MAIN_SEND_POSITION, OK, POSITION_FMT.size)
+  POSITION_HEADER_SUM = sum(POSITION_HEADER)
+  POSITION_FRAME_LEN = CMD_HEADER_LEN + POSITION_FMT.size + 1
 
   def __init__(self, cmd: Cmd):
     self.cmd = cmd
@@ -48,6 +53,11 @@ class CmdHand:
       err_code = packet.err_code
     return err_code, None
 
+  def setEnableRequest(self, enable):
+    """setEnable without waiting: returns the Future of the response."""
+    send_buf = pack("<BI", 0, enable)
+    return self.cmd.request(self.CMD_BLDC_SET, send_buf, len(send_buf))
+
   def getEnable(self, enable, timeout=500):
     err_code = ERR_CMD_RX_TIMEOUT
     send_buf = pack("B", 0)
@@ -83,8 +93,31 @@ class CmdHand:
     return err_code, None
 
   def sendPosition(self, id, position, velocity=5):
-    send_buf = pack("<Bff", id, position, velocity)
-    self.cmd.send(CmdPacket.PKT_TYPE_CTRL, self.CMD_MAIN_SEND_POSITION, 0, send_buf, len(send_buf))
+    return self.sendPositions(((id, position, velocity),))
+
+  def buildPositions(self, targets):
+    """Encode [(id, position, velocity), ...] as consecutive position packets."""
+    frame_len = self.POSITION_FRAME_LEN
+    header = self.POSITION_HEADER
+    header_sum = self.POSITION_HEADER_SUM
+    pack_into = self.POSITION_FMT.pack_into
+
+    targets = list(targets)
+    buffer = bytearray(frame_len * len(targets))
+    view = memoryview(buffer)
+    offset = 0
+    for id, position, velocity in targets:
+      data_offset = offset + CMD_HEADER_LEN
+      check_offset = offset + frame_len - 1
+      buffer[offset:data_offset] = header
+      pack_into(buffer, data_offset, id, position, velocity)
+      buffer[check_offset] = (-(header_sum + sum(view[data_offset:check_offset]))) & 0xFF
+      offset += frame_len
+    return buffer
+
+  def sendPositions(self, targets):
+    """Send the position of several joints in a single serial write."""
+    self.cmd.write(self.buildPositions(targets))
     return OK, None
 
   def sendPing(self):
@@ -116,10 +149,113 @@ class CmdHand:
     send_buf = pack("B", index)
     ret, packet = self.cmd.sendCmdRxResp(self.CMD_MAIN_GET_MODULE_INFO, send_buf, len(send_buf), timeout)
     if ret == True:
-      err_code = packet.err_code
-      if packet.err_code == 0:
-        str_fmt = "<BB32s"
-        fmt_size = calcsize(str_fmt)
-        data = unpack(str_fmt, packet.data[:fmt_size])
-        resp = data
+      err_code, resp = self.parseModuleInfo(packet)
     return err_code, resp
+
+  def getModuleInfoAll(self, timeout=500):
+    """Info of every module, with all getModuleInfo requests in flight at once.
+
+    Returns err_code and a list of (err_code, info) per module index.
+    """
+    err_code, count = self.getModuleCount(timeout)
+    if err_code != OK:
+      return err_code, []
+
+    requests = []
+    for index in range(count):
+      send_buf = pack("B", index)
+      requests.append((self.CMD_MAIN_GET_MODULE_INFO, send_buf, len(send_buf)))
+
+    resp = []
+    for ret, packet in self.cmd.sendCmdRxRespMany(requests, timeout):
+      if ret == True:
+        resp.append(self.parseModuleInfo(packet))
+      else:
+        err_code = ERR_CMD_RX_TIMEOUT
+        resp.append((ERR_CMD_RX_TIMEOUT, None))
+    return err_code, resp
+
+  def parseModuleInfo(self, packet):
+    resp = None
+    if packet.err_code == 0:
+      str_fmt = "<BB32s"
+      fmt_size = calcsize(str_fmt)
+      resp = unpack(str_fmt, packet.data[:fmt_size])
+    return packet.err_code, resp
+
+
+class PositionStreamer:
+  """Sends the latest joint targets at a fixed rate from its own thread.
+
+  Each cycle has a deadline of start + n * period. A cycle that starts more
+  than one period late is skipped and counted in missed_count, so a stall does
+  not turn into a burst of stale targets.
+  """
+
+  def __init__(self, cmd_hand: CmdHand, rate=200.0):
+    self.cmd_hand = cmd_hand
+    self.period = 1.0 / rate
+    self.targets = None
+    self.lock = threading.Lock()
+    self.is_running = False
+    self.thread = None
+
+    self.sent_count = 0
+    self.missed_count = 0
+    self.max_late = 0.0
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.stop()
+
+  def setTargets(self, targets):
+    """[(id, position, velocity), ...] to send from the next cycle on."""
+    buffer = self.cmd_hand.buildPositions(targets)
+    with self.lock:
+      self.targets = buffer
+
+  def start(self):
+    self.is_running = True
+    self.thread = threading.Thread(target=self._run, daemon=True)
+    self.thread.start()
+
+  def stop(self):
+    self.is_running = False
+    if self.thread is not None:
+      self.thread.join()
+      self.thread = None
+
+  def _run(self):
+    next_time = time.perf_counter()
+    while self.is_running:
+      now = time.perf_counter()
+      if now < next_time:
+        time.sleep(next_time - now)
+        now = time.perf_counter()
+
+      late = now - next_time
+      self.max_late = max(self.max_late, late)
+      if late > self.period:
+        missed = int(late / self.period)
+        self.missed_count += missed
+        next_time += missed * self.period
+
+      with self.lock:
+        targets = self.targets
+      if targets is not None:
+        try:
+          self.cmd_hand.cmd.write(targets)
+          self.sent_count += 1
+        except Exception as e:
+          print(e)
+      next_time += self.period
+
+  def getStats(self):
+    return {
+      "sent": self.sent_count,
+      "missed": self.missed_count,
+      "max_late_ms": self.max_late * 1000,
+    }
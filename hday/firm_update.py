@@ -0,0 +1,225 @@
+import os
+import time
+import argparse
+import concurrent.futures
+from collections import deque
+
+from hday.err_code import *
+from hday.cmd import Cmd, CmdEventLoop
+from hday.cmd_boot import CmdBoot, BootBegin
+
+
+class FirmUpdateResult:
+  def __init__(self, port=""):
+    self.port = port
+    self.err_code = OK
+    self.image_size = 0
+    self.chunk_count = 0
+    self.written_count = 0
+    self.written_bytes = 0
+    self.skipped_count = 0
+    self.retry_count = 0
+    self.erased_bytes = 0
+    self.elapsed = 0.0
+
+  def throughput(self):
+    if self.elapsed <= 0:
+      return 0.0
+    return self.written_bytes / self.elapsed
+
+  def __str__(self):
+    return (f"{self.port} err: {hex(self.err_code)}  "
+            f"chunks: {self.written_count} written / {self.skipped_count} skipped / {self.chunk_count} total  "
+            f"retries: {self.retry_count}  erased: {self.erased_bytes} bytes  "
+            f"{self.elapsed:.2f} s  {self.throughput() / 1024:.1f} KB/s")
+
+
+class FirmUpdater:
+  """Flashes a firmware image through CmdBoot with several writes in flight.
+
+  The image is sent in chunk_size pieces with up to `window` writes waiting
+  for their response. Chunks that fail or time out are retried, up to
+  `retries` more passes. With resume=True the flash is read back first and
+  chunks that already match are skipped. If some chunk holds other data,
+  only its sectors are erased when the erase unit sector_size is given;
+  without it the whole image is erased and every non-blank chunk is written.
+  That makes an interrupted update cheap to restart.
+  """
+
+  def __init__(self, cmd_boot: CmdBoot, chunk_size=1024, window=8, retries=3, resume=True,
+               sector_size=None, timeout=500, erase_timeout=5000):
+    self.cmd_boot = cmd_boot
+    self.chunk_size = chunk_size
+    self.window = max(1, window)
+    self.retries = retries
+    self.resume = resume
+    self.sector_size = sector_size
+    self.timeout = timeout
+    self.erase_timeout = erase_timeout
+
+    if self.sector_size is not None and self.sector_size % self.chunk_size != 0:
+      raise ValueError("sector_size must be a multiple of chunk_size")
+
+  def update(self, image, fw_name, addr=0, apply=True, result=None):
+    if result is None:
+      result = FirmUpdateResult()
+    start_time = time.perf_counter()
+    result.image_size = len(image)
+
+    chunks = [(addr + offset, image[offset:offset + self.chunk_size])
+              for offset in range(0, len(image), self.chunk_size)]
+    result.chunk_count = len(chunks)
+
+    err_code, _ = self.cmd_boot.firmBegin(BootBegin(fw_name, len(image)), self.timeout)
+    if err_code == OK:
+      if self.resume:
+        err_code, chunks = self._planResume(addr, image, chunks, result)
+      else:
+        err_code, _ = self.cmd_boot.firmErase(addr, len(image), self.erase_timeout)
+        result.erased_bytes += len(image)
+
+    if err_code == OK:
+      err_code = self._writeChunks(chunks, result)
+    if err_code == OK:
+      err_code, _ = self.cmd_boot.firmVerify(self.timeout)
+    if err_code == OK and apply:
+      err_code, _ = self.cmd_boot.firmUpdate(self.timeout)
+
+    result.err_code = err_code
+    result.elapsed = time.perf_counter() - start_time
+    return result
+
+  def _pipeline(self, items, make_request):
+    """Run make_request(item) for every item, keeping `window` of them in flight.
+
+    Returns [(item, ret, packet), ...] in item order.
+    """
+    results = []
+    in_flight = deque()
+    for item in items:
+      in_flight.append((item, make_request(item)))
+      if len(in_flight) >= self.window:
+        item, future = in_flight.popleft()
+        results.append((item, *self.cmd_boot.cmd.waitResp(future, self.timeout)))
+    while in_flight:
+      item, future = in_flight.popleft()
+      results.append((item, *self.cmd_boot.cmd.waitResp(future, self.timeout)))
+    return results
+
+  def _planResume(self, addr, image, chunks, result):
+    read_back = self._pipeline(chunks, lambda chunk: self.cmd_boot.firmReadRequest(chunk[0], len(chunk[1])))
+
+    dirty_chunks = set()
+    matching = set()
+    for (chunk_addr, data), ret, packet in read_back:
+      current = None
+      if ret == True and packet.err_code == OK:
+        current = packet.data[:len(data)]
+      if current == data:
+        matching.add(chunk_addr)
+      elif current is None or current.count(0xFF) != len(current):
+        dirty_chunks.add(chunk_addr)
+
+    if dirty_chunks and self.sector_size is None:
+      # Erase unit unknown: a partial erase could wipe chunks that are skipped, so start over.
+      err_code, _ = self.cmd_boot.firmErase(addr, len(image), self.erase_timeout)
+      if err_code != OK:
+        return err_code, []
+      result.erased_bytes += len(image)
+      pending = [(chunk_addr, data) for chunk_addr, data in chunks if data.count(0xFF) != len(data)]
+      result.skipped_count += len(chunks) - len(pending)
+      return OK, pending
+
+    dirty_sectors = set((chunk_addr - addr) // self.sector_size for chunk_addr in dirty_chunks)
+    for sector in sorted(dirty_sectors):
+      sector_addr = addr + sector * self.sector_size
+      length = min(self.sector_size, addr + len(image) - sector_addr)
+      err_code, _ = self.cmd_boot.firmErase(sector_addr, length, self.erase_timeout)
+      if err_code != OK:
+        return err_code, []
+      result.erased_bytes += length
+
+    pending = []
+    for chunk_addr, data in chunks:
+      erased = dirty_sectors and (chunk_addr - addr) // self.sector_size in dirty_sectors
+      if chunk_addr in matching and not erased:
+        result.skipped_count += 1
+      elif erased and data.count(0xFF) == len(data):
+        result.skipped_count += 1
+      else:
+        pending.append((chunk_addr, data))
+    return OK, pending
+
+  def _writeChunks(self, chunks, result):
+    err_code = OK
+    for attempt in range(self.retries + 1):
+      if attempt > 0:
+        result.retry_count += len(chunks)
+
+      failed = []
+      err_code = OK
+      writes = self._pipeline(chunks, lambda chunk: self.cmd_boot.firmWriteRequest(chunk[0], chunk[1]))
+      for chunk, ret, packet in writes:
+        if ret == True and packet.err_code == OK:
+          result.written_count += 1
+          result.written_bytes += len(chunk[1])
+        else:
+          err_code = packet.err_code if ret == True else ERR_CMD_RX_TIMEOUT
+          failed.append(chunk)
+
+      chunks = failed
+      if not chunks:
+        break
+    return err_code
+
+
+def flashPort(port, image, fw_name, baud=600, loop=None, addr=0, apply=True, **kwargs):
+  result = FirmUpdateResult(port)
+  cmd = Cmd(loop)
+  if cmd.open(port, baud) == False:
+    result.err_code = ERR_CMD_NOT_OPEN
+    cmd.stop()
+    return result
+  try:
+    FirmUpdater(CmdBoot(cmd), **kwargs).update(image, fw_name, addr, apply, result)
+  finally:
+    cmd.stop()
+    cmd.close()
+  return result
+
+
+def flashPorts(ports, image, fw_name, baud=600, **kwargs):
+  """Flash the same image to several ports in parallel. Reads for all ports share one event loop."""
+  with CmdEventLoop() as loop:
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, len(ports))) as pool:
+      futures = [pool.submit(flashPort, port, image, fw_name, baud, loop, **kwargs) for port in ports]
+      return [future.result() for future in futures]
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Flash a firmware image to one or more hands.')
+  parser.add_argument('image', type=str, help='Firmware binary')
+  parser.add_argument('--ports', type=str, default='/dev/ttyACM0', help='Comma separated serial ports')
+  parser.add_argument('--name', type=str, default=None, help='Firmware name sent with firmBegin (default: file name)')
+  parser.add_argument('--addr', type=int, default=0, help='Start address of the image')
+  parser.add_argument('--chunk', type=int, default=1024, help='Bytes per write command')
+  parser.add_argument('--window', type=int, default=8, help='Writes in flight at once')
+  parser.add_argument('--retries', type=int, default=3, help='Retry passes for failed chunks')
+  parser.add_argument('--sector', type=int, default=None, help='Erase unit in bytes, needed to erase only the sectors that differ')
+  parser.add_argument('--no_resume', action='store_true', help='Erase everything instead of skipping matching chunks')
+  parser.add_argument('--no_apply', action='store_true', help='Verify only, do not call firmUpdate')
+  args = parser.parse_args()
+
+  with open(args.image, "rb") as f:
+    image = f.read()
+  fw_name = args.name if args.name is not None else os.path.basename(args.image)
+
+  results = flashPorts(args.ports.split(','), image, fw_name, addr=args.addr, apply=not args.no_apply,
+                       chunk_size=args.chunk, window=args.window, retries=args.retries,
+                       sector_size=args.sector, resume=not args.no_resume)
+  for result in results:
+    print(result)
+
+
+if __name__ == "__main__":
+  main()
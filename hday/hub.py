@@ -0,0 +1,178 @@
+import time
+import threading
+
+import numpy as np
+
+from hday.err_code import *
+from hday.ring import PacketRing
+from hday.cmd import CmdEventLoop
+from hday.robot import Robot, decodeSensorBypassBatch, SENSOR_BYPASS_SIZE
+
+
+class HubPacket:
+  __slots__ = ("port", "rx_ns", "packet")
+
+  def __init__(self, port, rx_ns, packet):
+    self.port = port
+    self.rx_ns = rx_ns
+    self.packet = packet
+
+
+class PortHealth:
+  def __init__(self, port):
+    self.port = port
+    self.is_open = False
+    self.open_ns = 0
+    self.packet_count = 0
+    self.last_rx_ns = 0
+    self.sensor_ids = set()
+    self.prev_count = 0
+    self.prev_ns = time.monotonic_ns()
+
+
+class RobotHub:
+  """Several tactile controllers read by one event loop thread.
+
+  Every port gets a Robot on a shared CmdEventLoop. Their sensor bypass
+  packets keep the monotonic_ns receive time from the framer, are tagged
+  with the port and merged into one stream, read with drainSensorBypassPackets(). A port that
+  fails to open is reported in getHealth() instead of stopping the others.
+  """
+
+  def __init__(self, ports, baud=600, ring_size=16384):
+    if isinstance(ports, str):
+      ports = [port for port in ports.split(',') if port]
+    self.ports = list(ports)
+    self.baud = baud
+    self.event_loop = CmdEventLoop()
+    self.loop = None
+    self.ring = PacketRing(ring_size)
+    self.robots = {}
+    self.health = {port: PortHealth(port) for port in self.ports}
+    self.lock = threading.Lock()
+
+  def __enter__(self):
+    self.open()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.close()
+
+  def open(self):
+    self.loop = self.event_loop.start()
+    for port in self.ports:
+      robot = Robot(port, self.baud, self.loop,
+                    sensor_callback=lambda packet, port=port: self._onSensorPacket(port, packet))
+      self.robots[port] = robot
+      self.health[port].is_open = robot.cmd.open(port, self.baud)
+      self.health[port].open_ns = time.monotonic_ns()
+    return self
+
+  def close(self):
+    for robot in self.robots.values():
+      if robot.cmd.is_open and robot.cmd.rxd_thread.fd is not None:
+        robot.__exit__(None, None, None)
+      else:
+        # A lost port (e.g. unplugged) cannot be disabled any more, only closed.
+        robot.cmd.stop()
+        robot.cmd.close()
+    self.robots = {}
+    self.event_loop.stop()
+
+  def enable(self, enable=True):
+    """Send the enable request to every open port, all at once."""
+    futures = []
+    for port, robot in self.robots.items():
+      if self.health[port].is_open:
+        futures.append((robot, robot.cmd_hand.setEnableRequest(enable)))
+    err_code = OK
+    for robot, future in futures:
+      ret, packet = robot.cmd.waitResp(future, 500)
+      port_err = packet.err_code if ret == True else ERR_CMD_RX_TIMEOUT
+      if port_err == OK:
+        robot.is_enable = enable
+      else:
+        print(f"{robot.port} enable Err : {hex(port_err)}")
+        err_code = port_err
+    return err_code
+
+  def _onSensorPacket(self, port, packet):
+    # Called on the event loop thread for every packet, keep it short.
+    health = self.health[port]
+    health.packet_count += 1
+    health.last_rx_ns = packet.rx_ns
+    self.ring.put(HubPacket(port, packet.rx_ns, packet))
+
+  def drainSensorBypassPackets(self, timeout=0):
+    """Merged stream since the previous call as [(port, rx_ns, id, data), ...] in arrival order."""
+    packets = []
+    for hub_packet in self.ring.drain(timeout=timeout):
+      robot = self.robots.get(hub_packet.port)
+      if robot is None or hub_packet.packet.length < SENSOR_BYPASS_SIZE:
+        continue
+      sensor_id, sensor_data = robot.processStatusSenorBypass(hub_packet.packet)
+      self.health[hub_packet.port].sensor_ids.add(sensor_id)
+      packets.append((hub_packet.port, hub_packet.rx_ns, sensor_id, sensor_data))
+    return packets
+
+  def drainSensorBypassBatch(self, timeout=0):
+    """Merged stream decoded at once as (port_index, ids, rx_ns, values).
+
+    port_index (N,) indexes self.ports, values is (N, 16, 3) int16; see decodeSensorBypassBatch().
+    """
+    hub_packets = [hub_packet for hub_packet in self.ring.drain(timeout=timeout) if hub_packet.port in self.robots]
+    port_index = {port: index for index, port in enumerate(self.ports)}
+    hub_packets = [hub_packet for hub_packet in hub_packets if hub_packet.packet.length >= SENSOR_BYPASS_SIZE]
+    ports = np.fromiter((port_index[hub_packet.port] for hub_packet in hub_packets), dtype=np.int16, count=len(hub_packets))
+    ids, rx_ns, values = decodeSensorBypassBatch([hub_packet.packet for hub_packet in hub_packets])
+    for index in np.unique(ports):
+      self.health[self.ports[index]].sensor_ids.update(np.unique(ids[ports == index]).tolist())
+    return ports, ids, rx_ns, values
+
+  def getStats(self):
+    """Receive path statistics of every open port, see Cmd.getStats()."""
+    return {port: robot.getStats() for port, robot in self.robots.items() if robot.cmd.is_open}
+
+  def resetStats(self):
+    """Start the receive path statistics of every port over, e.g. at the start of an episode."""
+    for robot in self.robots.values():
+      robot.resetStats()
+    self.ring.overflow_count = 0
+
+  def isAlive(self, stale_after=1.0):
+    """True while every port is open, still read and got a sensor packet within stale_after seconds."""
+    now_ns = time.monotonic_ns()
+    for port, health in self.health.items():
+      robot = self.robots.get(port)
+      if not health.is_open or robot is None or robot.cmd.rxd_thread.fd is None:
+        return False
+      if (now_ns - max(health.last_rx_ns, health.open_ns)) / 1e9 >= stale_after:
+        return False
+    return True
+
+  def getHealth(self):
+    """Per-port link state: open/reading, packet counts and rate since the previous call, losses."""
+    now_ns = time.monotonic_ns()
+    report = {}
+    with self.lock:
+      for port, health in self.health.items():
+        robot = self.robots.get(port)
+        elapsed = (now_ns - health.prev_ns) / 1e9
+        rate = (health.packet_count - health.prev_count) / elapsed if elapsed > 0 else 0.0
+        health.prev_count = health.packet_count
+        health.prev_ns = now_ns
+
+        report[port] = {
+          "open": health.is_open,
+          "reading": robot is not None and robot.cmd.rxd_thread.fd is not None,
+          "packets": health.packet_count,
+          "rate": rate,
+          "age_ms": (now_ns - health.last_rx_ns) / 1e6 if health.last_rx_ns else None,
+          "sensor_ids": sorted(health.sensor_ids),
+          "counters": robot.getRxCounters() if robot is not None else None,
+          "checksum_errors": robot.cmd.rxd_thread.framer.checksum_fail_count if robot is not None else 0,
+          "length_errors": robot.cmd.rxd_thread.framer.length_fail_count if robot is not None else 0,
+          "resyncs": robot.cmd.rxd_thread.framer.resync_count if robot is not None else 0,
+        }
+      report["merged_overflow"] = self.ring.overflow_count
+    return report
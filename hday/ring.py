@@ -0,0 +1,64 @@
+import threading
+
+
+class PacketRing:
+  """Bounded ring buffer of received packets.
+
+  drain() returns all packets put since the previous drain, oldest first, and
+  can wait for the next one. When the reader falls more than `size` packets
+  behind, the oldest ones are overwritten and counted in overflow_count.
+  """
+
+  def __init__(self, size=4096):
+    self.size = size
+    self.slots = [None] * size
+    self.head = 0             # index of the next packet to put
+    self.tail = 0             # index of the next packet to drain
+    self.overflow_count = 0
+    self.lock = threading.Lock()
+    self.cond = threading.Condition(self.lock)
+
+  def __len__(self):
+    return self.head - self.tail
+
+  def put(self, packet):
+    with self.cond:
+      index = self.head
+      self.slots[index % self.size] = packet
+      self.head = index + 1
+      if self.head - self.tail > self.size:
+        self.overflow_count += self.head - self.tail - self.size
+        self.tail = self.head - self.size
+      self.cond.notify_all()
+    return index
+
+  def wait(self, timeout=None):
+    """Block until a packet is pending or timeout (seconds) expires."""
+    with self.cond:
+      return self.cond.wait_for(lambda: self.head > self.tail, timeout)
+
+  def drain(self, max_count=None, timeout=0):
+    with self.cond:
+      if timeout != 0:
+        self.cond.wait_for(lambda: self.head > self.tail, timeout)
+      start = self.tail
+      end = self.head
+      if max_count is not None:
+        end = min(end, start + max_count)
+      packets = [self.slots[index % self.size] for index in range(start, end)]
+      self.tail = end
+    return packets
+
+  def get(self, timeout=None):
+    packets = self.drain(1, timeout)
+    return packets[0] if packets else None
+
+  def latest(self):
+    with self.lock:
+      if self.head == 0:
+        return None
+      return self.slots[(self.head - 1) % self.size]
+
+  def clear(self):
+    with self.lock:
+      self.tail = self.head
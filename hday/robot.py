@@ -1,12 +1,47 @@
-from struct import unpack, calcsize
-import copy
+import numpy as np
 
 from . import Cmd, CmdBoot, CmdHand, CmdPacket, OK
 
 
+SENSOR_BYPASS_HEADER = 3    # id, type, length
+SENSOR_BYPASS_TAXELS = 16
+SENSOR_BYPASS_AXES   = 3
+SENSOR_BYPASS_SCALE  = 2
+SENSOR_BYPASS_SIZE   = SENSOR_BYPASS_HEADER + SENSOR_BYPASS_TAXELS * SENSOR_BYPASS_AXES
+
+
+def decodeSensorBypass(data):
+    """Sensor bypass payload as (id, (16, 3) int16 array), values already scaled."""
+    values = np.frombuffer(data, dtype=np.int8, count=SENSOR_BYPASS_TAXELS * SENSOR_BYPASS_AXES,
+                           offset=SENSOR_BYPASS_HEADER)
+    values = values.reshape(SENSOR_BYPASS_TAXELS, SENSOR_BYPASS_AXES).astype(np.int16)
+    values *= SENSOR_BYPASS_SCALE
+    return data[0], values
+
+
+def decodeSensorBypassBatch(packets):
+    """N sensor bypass packets as (ids (N,) uint8, rx_ns (N,) int64, values (N, 16, 3) int16).
+
+    All payloads are copied into one buffer and decoded with a single frombuffer,
+    so the cost per packet is a bytes join instead of 16 unpack calls and lists.
+    Packets shorter than a full payload are skipped.
+    """
+    packets = [packet for packet in packets if packet.length >= SENSOR_BYPASS_SIZE]
+    count = len(packets)
+    rx_ns = np.fromiter((packet.rx_ns for packet in packets), dtype=np.int64, count=count)
+    raw = np.frombuffer(b"".join(packet.data[:SENSOR_BYPASS_SIZE] for packet in packets), dtype=np.uint8)
+    raw = raw.reshape(count, SENSOR_BYPASS_SIZE)
+    ids = raw[:, 0].copy()
+    values = raw[:, SENSOR_BYPASS_HEADER:].view(np.int8).astype(np.int16)
+    values *= SENSOR_BYPASS_SCALE
+    return ids, rx_ns, values.reshape(count, SENSOR_BYPASS_TAXELS, SENSOR_BYPASS_AXES)
+
+
 class Robot():
-    def __init__(self, port, baud=600):
-        self.cmd = Cmd()
+    SENSOR_BYPASS_CMD = 0x000B
+
+    def __init__(self, port, baud=600, loop=None, sensor_callback=None):
+        self.cmd = Cmd(loop)
         self.cmd_boot = CmdBoot(self.cmd)
         self.cmd_hand = CmdHand(self.cmd)
 
@@ -14,6 +49,10 @@ class Robot():
         self.baud = baud
 
         self.is_enable = False
+        # With a sensor_callback, sensor bypass packets go there instead of to drainSensorBypassPackets().
+        self.sensor_sub = self.cmd.subscribe(CmdPacket.PKT_TYPE_STATUS, self.SENSOR_BYPASS_CMD, sensor_callback)
+        # Everything is read through sensor_sub, the catch-all ring would only fill up and overflow.
+        self.cmd.setRxRing(False)
 
         if self.cmd.is_open:
             self.cmd.close()
@@ -67,31 +106,57 @@ class Robot():
         else:
             print("Err : " + str(hex(err_code)))
 
-    def getSensorBypassPacket(self):
-        cmd_packet = self.cmd.getPacket()
-        if cmd_packet is None:
-            return None, None
+    def getSensorBypassPacket(self, with_timestamp=False):
+        """Latest sensor bypass packet as (id, data), or (id, data, rx_ns) with_timestamp.
+
+        rx_ns is the time.monotonic_ns() at which the packet's checksum was validated.
+        """
+        packet = self.cmd.getPacket()
+        if packet is None or packet.type != packet.PKT_TYPE_STATUS or packet.cmd != self.SENSOR_BYPASS_CMD \
+                or packet.length < SENSOR_BYPASS_SIZE:
+            return (None, None, None) if with_timestamp else (None, None)
+
+        return self._decode(packet, with_timestamp)
+
+    def drainSensorBypassPackets(self, timeout=0, with_timestamp=False):
+        """All sensor bypass packets received since the previous call as [(id, data), ...].
+
+        With a timeout (seconds, None for no limit) wait until at least one arrives.
+        with_timestamp adds the receive time: [(id, data, rx_ns), ...]. Short packets are skipped.
+        """
+        return [self._decode(packet, with_timestamp) for packet in self.sensor_sub.drain_packets(timeout)
+                if packet.length >= SENSOR_BYPASS_SIZE]
+
+    def drainSensorBypassBatch(self, timeout=0):
+        """Like drainSensorBypassPackets() but decoded at once: (ids, rx_ns, values (N, 16, 3))."""
+        return decodeSensorBypassBatch(self.sensor_sub.drain_packets(timeout))
+
+    def wait_for_packet(self, timeout=None, with_timestamp=False):
+        """Next sensor bypass packet as (id, data), (None, None) on timeout."""
+        packet = self.sensor_sub.wait_for_packet(timeout)
+        if packet is None or packet.length < SENSOR_BYPASS_SIZE:
+            return (None, None, None) if with_timestamp else (None, None)
+        return self._decode(packet, with_timestamp)
+
+    def _decode(self, packet, with_timestamp):
+        sensor_bypass_id, sensor_bypass_data = self.processStatusSenorBypass(packet)
+        if with_timestamp:
+            return sensor_bypass_id, sensor_bypass_data, packet.rx_ns
+        return sensor_bypass_id, sensor_bypass_data
 
-        packet = copy.deepcopy(cmd_packet)
-        cmd_packet = None
+    def getRxCounters(self):
+        counters = self.cmd.getRxCounters()
+        counters["overflow"] = self.sensor_sub.ring.overflow_count
+        return counters
 
-        if packet.type == packet.PKT_TYPE_STATUS and packet.cmd == 0x000B:
-            return self.processStatusSenorBypass(packet)
+    def getStats(self):
+        stats = self.cmd.getStats()
+        stats.update(self.getRxCounters())
+        return stats
 
-        return None, None
+    def resetStats(self):
+        self.cmd.resetStats()
+        self.sensor_sub.ring.overflow_count = 0
 
     def processStatusSenorBypass(self, packet: CmdPacket):
-        str_fmt = "<3b"
-        fmt_size = calcsize(str_fmt)
-
-        sensor_bypass_id = packet.data[0]
-        # sensor_bypass_type = packet.data[1]
-        # sensor_bypass_length = packet.data[2]
-        sensor_bypass_data = []
-        for idx in range(0, 16):
-            data = unpack(str_fmt, packet.data[3+(idx*fmt_size):3+(idx*fmt_size)+fmt_size])
-            scaled_data = [v*2 for v in data]
-            # print(f"{idx:02} : {scaled_data}")
-            sensor_bypass_data.append(scaled_data)
-
-        return sensor_bypass_id, sensor_bypass_data
+        return decodeSensorBypass(packet.data)
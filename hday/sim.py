@@ -0,0 +1,310 @@
+import os
+import tty
+import math
+import time
+import select
+import random
+import argparse
+import threading
+from queue import Queue, Empty
+from struct import pack, unpack
+
+from hday.err_code import *
+from hday.cmd import CmdFramer, CmdPacket, buildPacket
+from hday.cmd_boot import CmdBoot
+from hday.cmd_hand import CmdHand
+
+
+SENSOR_BYPASS_CMD = 0x000B
+SENSOR_IDS        = tuple(range(128, 140))
+
+
+class TactileSimulator:
+  """Tactile hand firmware emulated on a pseudo-terminal.
+
+  Open `port` with Robot/Cmd like a real /dev/ttyACM device. The simulator
+  answers CMD_BLDC_SET/GET and BOOT_CMD_VERSION and, once enabled, streams
+  PKT_TYPE_STATUS sensor bypass packets for every id at `rate` Hz each.
+
+    pattern : "sine" moves every value along a +-20 sine, "static" keeps it at a
+              fixed per-taxel offset so sensor validation settles like an idle hand
+    noise   : standard deviation of the random part of every value
+    corrupt : probability that a streamed packet gets a broken checksum
+    garbage : probability that random bytes are written in front of a packet
+    latency : seconds between receiving a command and sending its response
+    lose    : probability that a response is never sent; loseResponses(count, cmd)
+              loses the next count responses (to cmd only, if given)
+
+  The boot loader's firmware commands work on an emulated flash of
+  flash_size bytes; write_fail is the probability that a write is rejected.
+  """
+
+  SAMPLE_CYCLE = 64   # pre-generated samples per sensor, streamed round robin
+
+  PATTERNS = ("sine", "static")
+
+  def __init__(self, rate=100.0, sensor_ids=SENSOR_IDS, noise=1.0, corrupt=0.0, garbage=0.0,
+               always_stream=False, seed=None, latency=0.0, module_count=2, flash_size=0x40000, write_fail=0.0,
+               pattern="sine", lose=0.0):
+    if pattern not in self.PATTERNS:
+      raise ValueError(f"pattern must be one of {self.PATTERNS}")
+    self.rate = rate
+    self.pattern = pattern
+    self.sensor_ids = tuple(sensor_ids)
+    self.noise = noise
+    self.corrupt = corrupt
+    self.garbage = garbage
+    self.rng = random.Random(seed)
+    self.latency = latency
+    self.lose = lose
+    self.lose_count = 0
+    self.lose_cmd = None
+    self.module_count = module_count
+    self.flash = bytearray(b"\xff" * flash_size)
+    self.write_fail = write_fail
+    self.flash_write_count = 0
+
+    self.master_fd, self.slave_fd = os.openpty()
+    tty.setraw(self.slave_fd)
+    self.port = os.ttyname(self.slave_fd)
+
+    self.is_enable = always_stream
+    self.is_running = False
+    self.write_lock = threading.Lock()
+    self.framer = CmdFramer(self._onPacket)
+    self.resp_q = Queue()
+    self.rx_thread = None
+    self.tx_thread = None
+    self.resp_thread = None
+
+    phase_step = 1.0 / self.SAMPLE_CYCLE if pattern == "sine" else 0.0
+    self.samples = {sensor_id: [self.makeSensorBypassPacket(sensor_id, idx * phase_step)
+                                for idx in range(self.SAMPLE_CYCLE)]
+                    for sensor_id in self.sensor_ids}
+
+    self.sent_count = {sensor_id: 0 for sensor_id in self.sensor_ids}
+    self.corrupt_count = 0
+    self.late_count = 0
+    self.positions = {}
+    self.position_count = 0
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.stop()
+
+  def start(self):
+    self.is_running = True
+    self.rx_thread = threading.Thread(target=self._rxLoop, daemon=True)
+    self.tx_thread = threading.Thread(target=self._txLoop, daemon=True)
+    self.resp_thread = threading.Thread(target=self._respLoop, daemon=True)
+    self.rx_thread.start()
+    self.tx_thread.start()
+    self.resp_thread.start()
+
+  def stop(self):
+    self.is_running = False
+    if self.tx_thread is not None:
+      self.tx_thread.join()
+    if self.rx_thread is not None:
+      self.rx_thread.join()
+    if self.resp_thread is not None:
+      self.resp_thread.join()
+    os.close(self.slave_fd)
+    os.close(self.master_fd)
+
+  def setEnable(self, enable):
+    self.is_enable = enable
+
+  def getSentCount(self):
+    return sum(self.sent_count.values())
+
+  def _write(self, data):
+    with self.write_lock:
+      view = memoryview(data)
+      while len(view) > 0:
+        view = view[os.write(self.master_fd, view):]
+
+  def loseResponses(self, count=1, cmd=None):
+    self.lose_cmd = cmd
+    self.lose_count = count
+
+  def _respond(self, cmd, err_code, data=None):
+    if self.lose_count > 0 and self.lose_cmd in (None, cmd):
+      self.lose_count -= 1
+      return
+    if self.lose > 0 and self.rng.random() < self.lose:
+      return
+    due_time = time.monotonic() + self.latency
+    self.resp_q.put((due_time, buildPacket(CmdPacket.PKT_TYPE_RESP, cmd, err_code, data)))
+
+  def _respLoop(self):
+    while self.is_running:
+      try:
+        due_time, packet = self.resp_q.get(timeout=0.1)
+      except Empty:
+        continue
+      delay = due_time - time.monotonic()
+      if delay > 0:
+        time.sleep(delay)
+      try:
+        self._write(packet)
+      except OSError:
+        break
+
+  def _rxLoop(self):
+    while self.is_running:
+      try:
+        readable, _, _ = select.select([self.master_fd], [], [], 0.1)
+        if not readable:
+          continue
+        data = os.read(self.master_fd, 4096)
+      except OSError:
+        break
+      if not data:
+        break
+      self.framer.feed(data)
+
+  def _onPacket(self, packet):
+    if packet.type == CmdPacket.PKT_TYPE_CTRL and packet.cmd == CmdHand.CMD_MAIN_SEND_POSITION:
+      id, position, velocity = unpack("<Bff", packet.data)
+      self.positions[id] = (position, velocity)
+      self.position_count += 1
+      return
+    if packet.type != CmdPacket.PKT_TYPE_CMD:
+      return
+
+    if packet.cmd == CmdHand.CMD_BLDC_SET:
+      if packet.length >= 5 and packet.data[0] == 0:
+        self.setEnable(packet.data[1] != 0)
+      self._respond(packet.cmd, OK)
+    elif packet.cmd == CmdHand.CMD_BLDC_GET:
+      self._respond(packet.cmd, OK, pack("<BI", 0, int(self.is_enable)))
+    elif packet.cmd == CmdHand.CMD_MAIN_GET_MODULE_CNT:
+      self._respond(packet.cmd, OK, pack("<B", self.module_count))
+    elif packet.cmd == CmdHand.CMD_MAIN_GET_MODULE_INFO:
+      index = packet.data[0] if packet.length > 0 else 0
+      if index < self.module_count:
+        self._respond(packet.cmd, OK, pack("<BB32s", index, 0, f"sim module {index}".encode("utf-8")))
+      else:
+        self._respond(packet.cmd, ERR_INVAILD_INDEX)
+    elif packet.cmd in (CmdBoot.BOOT_CMD_FW_BEGIN, CmdBoot.BOOT_CMD_FW_END,
+                        CmdBoot.BOOT_CMD_FW_VERIFY, CmdBoot.BOOT_CMD_FW_UPDATE):
+      self._respond(packet.cmd, OK)
+    elif packet.cmd == CmdBoot.BOOT_CMD_FW_ERASE:
+      addr, length = unpack("II", packet.data[:8])
+      if addr + length > len(self.flash):
+        self._respond(packet.cmd, ERR_BOOT_WRONG_RANGE)
+      else:
+        self.flash[addr:addr + length] = b"\xff" * length
+        self._respond(packet.cmd, OK)
+    elif packet.cmd == CmdBoot.BOOT_CMD_FW_WRITE:
+      addr, length = unpack("II", packet.data[:8])
+      data = packet.data[8:8 + length]
+      if addr + length > len(self.flash):
+        self._respond(packet.cmd, ERR_BOOT_WRONG_RANGE)
+      elif self.write_fail > 0 and self.rng.random() < self.write_fail:
+        self._respond(packet.cmd, ERR_BOOT_FLASH_WRITE)
+      else:
+        # Flash can only clear bits until it is erased again.
+        self.flash[addr:addr + length] = bytes(a & b for a, b in zip(self.flash[addr:addr + length], data))
+        self.flash_write_count += 1
+        self._respond(packet.cmd, OK)
+    elif packet.cmd == CmdBoot.BOOT_CMD_FW_READ:
+      addr, length = unpack("II", packet.data[:8])
+      if addr + length > len(self.flash):
+        self._respond(packet.cmd, ERR_BOOT_WRONG_RANGE)
+      else:
+        self._respond(packet.cmd, OK, bytes(self.flash[addr:addr + length]))
+    elif packet.cmd == CmdBoot.BOOT_CMD_VERSION:
+      data = b""
+      for name, version in (("sim boot", (1, 0, 0)), ("sim firm", (1, 0, 0)), ("sim update", (1, 0, 0))):
+        data += pack("<I4BHHHH2I32sI", 0, *version, 0, 0, 0, 0, 0, 0, 0, name.encode("utf-8"), 0)
+      self._respond(packet.cmd, OK, data)
+    else:
+      self._respond(packet.cmd, ERR_CMD_NO_CMD)
+
+  def makeSensorBypassPacket(self, sensor_id, phase):
+    values = bytearray(48)
+    for idx in range(48):
+      value = 20.0 * math.sin(2.0 * math.pi * (phase + idx / 48.0)) + self.rng.gauss(0.0, self.noise)
+      values[idx] = int(max(-128, min(127, value))) & 0xFF
+    return buildPacket(CmdPacket.PKT_TYPE_STATUS, SENSOR_BYPASS_CMD, OK,
+                       bytes((sensor_id, 0, len(values))) + values)
+
+  def _txLoop(self):
+    period = 1.0 / self.rate
+    next_time = time.monotonic()
+    cycle = 0
+    while self.is_running:
+      now = time.monotonic()
+      if now < next_time:
+        time.sleep(next_time - now)
+        continue
+      if now - next_time > period:
+        self.late_count += 1
+      next_time += period
+
+      if not self.is_enable:
+        continue
+
+      buffer = bytearray()
+      for sensor_id in self.sensor_ids:
+        packet = self.samples[sensor_id][cycle % self.SAMPLE_CYCLE]
+        if self.garbage > 0 and self.rng.random() < self.garbage:
+          buffer += bytes(self.rng.getrandbits(8) for _ in range(self.rng.randint(1, 16)))
+        if self.corrupt > 0 and self.rng.random() < self.corrupt:
+          packet = packet[:-1] + bytes((packet[-1] ^ 0xFF,))
+          self.corrupt_count += 1
+        else:
+          self.sent_count[sensor_id] += 1
+        buffer += packet
+      cycle += 1
+      try:
+        self._write(buffer)
+      except OSError:
+        break
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Emulate the tactile hand firmware on a pseudo-terminal.')
+  parser.add_argument('--rate', type=float, default=100.0, help='Packets per second for every sensor id')
+  parser.add_argument('--pattern', type=str, default='sine', choices=TactileSimulator.PATTERNS,
+                      help='sine: moving values, static: fixed offsets plus noise (passes sensor validation)')
+  parser.add_argument('--noise', type=float, default=1.0, help='Standard deviation of the sensor noise')
+  parser.add_argument('--corrupt', type=float, default=0.0, help='Probability of a broken checksum per packet')
+  parser.add_argument('--garbage', type=float, default=0.0, help='Probability of random bytes before a packet')
+  parser.add_argument('--latency', type=float, default=0.0, help='Seconds before a command is answered')
+  parser.add_argument('--lose', type=float, default=0.0, help='Probability that a command is never answered')
+  parser.add_argument('--modules', type=int, default=2, help='Number of modules reported to getModuleCount')
+  parser.add_argument('--always_stream', action='store_true', help='Stream without waiting for an enable request')
+  parser.add_argument('--link', type=str, default=None, help='Create a symlink to the pty, e.g. /tmp/ttyTACTILE')
+  args = parser.parse_args()
+
+  sim = TactileSimulator(args.rate, noise=args.noise, corrupt=args.corrupt, garbage=args.garbage,
+                         always_stream=args.always_stream, latency=args.latency, module_count=args.modules,
+                         pattern=args.pattern, lose=args.lose)
+  port = sim.port
+  if args.link is not None:
+    if os.path.islink(args.link):
+      os.remove(args.link)
+    os.symlink(sim.port, args.link)
+    port = args.link
+
+  print(f"Tactile simulator on {port} ({args.rate} Hz x {len(sim.sensor_ids)} sensors)")
+  with sim:
+    try:
+      while True:
+        time.sleep(1.0)
+        print(f"  sent: {sim.getSentCount()}  corrupted: {sim.corrupt_count}  late: {sim.late_count}")
+    except KeyboardInterrupt:
+      pass
+
+  if args.link is not None:
+    os.remove(args.link)
+
+
+if __name__ == "__main__":
+  main()
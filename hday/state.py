@@ -0,0 +1,111 @@
+import time
+
+import numpy as np
+
+from hday.robot import SENSOR_BYPASS_TAXELS, SENSOR_BYPASS_AXES
+
+
+TACTILE_SENSOR_IDS = tuple(range(128, 140))
+
+
+class TactileState:
+  """Latest value of every tactile sensor in preallocated arrays.
+
+    values : (len(sensor_ids), 16, 3) int16, row i belongs to sensor_ids[i]
+    rx_ns  : (len(sensor_ids),) int64 receive time of that row, 0 until the first packet
+
+  One thread calls update(), any number of threads call snapshot(). They
+  are synchronized with a sequence counter instead of a lock: the writer
+  makes seq odd while it copies and even again when done, a reader copies
+  both arrays and retries if seq was odd or changed meanwhile. The writer
+  therefore never waits and a snapshot is two array copies.
+  """
+
+  def __init__(self, sensor_ids=TACTILE_SENSOR_IDS):
+    self.sensor_ids = np.array(sensor_ids, dtype=np.int64)
+    self.index = np.full(256, -1, dtype=np.int64)
+    self.index[self.sensor_ids] = np.arange(len(self.sensor_ids))
+    self.values = np.zeros((len(self.sensor_ids), SENSOR_BYPASS_TAXELS, SENSOR_BYPASS_AXES), dtype=np.int16)
+    self.rx_ns = np.zeros(len(self.sensor_ids), dtype=np.int64)
+    self.baseline = np.zeros_like(self.values)
+    self.seq = 0
+    self.update_count = 0
+    self.retry_count = 0
+
+  def update(self, ids, rx_ns, values):
+    """Store a decoded batch minus the baseline, see decodeSensorBypassBatch(). Unknown ids are ignored.
+
+    When a sensor appears several times the last packet wins. Returns the rows written.
+    """
+    rows = self.index[ids]
+    known = rows >= 0
+    if not known.all():
+      rows, rx_ns, values = rows[known], rx_ns[known], values[known]
+    if len(rows) == 0:
+      return rows
+    # last occurrence of every row
+    count = len(rows)
+    rows, last = np.unique(rows[::-1], return_index=True)
+    last = count - 1 - last
+
+    self.seq += 1
+    self.values[rows] = values[last] - self.baseline[rows]
+    self.rx_ns[rows] = rx_ns[last]
+    self.seq += 1
+    self.update_count += 1
+    return rows
+
+  def updateOne(self, sensor_id, rx_ns, data):
+    row = self.index[sensor_id]
+    if row < 0:
+      return False
+    self.seq += 1
+    self.values[row] = data - self.baseline[row]
+    self.rx_ns[row] = rx_ns
+    self.seq += 1
+    self.update_count += 1
+    return True
+
+  def setBaseline(self, table=None):
+    """Offsets subtracted by update(), as {sensor_id: (16, 3) data}. None clears them."""
+    self.baseline.fill(0)
+    for sensor_id, data in (table or {}).items():
+      row = self.index[sensor_id]
+      if row >= 0:
+        self.baseline[row] = data
+
+  def snapshot(self, values=None, rx_ns=None):
+    """Consistent copy as (values, rx_ns). Pass preallocated arrays to copy into them."""
+    if values is None:
+      values = np.empty_like(self.values)
+    if rx_ns is None:
+      rx_ns = np.empty_like(self.rx_ns)
+    while True:
+      seq = self.seq
+      if seq & 1 == 0:
+        np.copyto(values, self.values)
+        np.copyto(rx_ns, self.rx_ns)
+        if self.seq == seq:
+          return values, rx_ns
+      self.retry_count += 1
+      time.sleep(0)   # let the writer finish
+
+  def receivedIds(self):
+    """Sensor ids that have been updated at least once."""
+    return self.sensor_ids[self.rx_ns != 0].tolist()
+
+  def get(self, sensor_id):
+    """(data, rx_ns) of one sensor, (None, 0) before its first packet."""
+    row = self.index[sensor_id]
+    if row < 0:
+      return None, 0
+    values, rx_ns = self.snapshot()
+    if rx_ns[row] == 0:
+      return None, 0
+    return values[row], int(rx_ns[row])
+
+  def clear(self):
+    self.seq += 1
+    self.values.fill(0)
+    self.rx_ns.fill(0)
+    self.seq += 1
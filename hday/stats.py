@@ -0,0 +1,156 @@
+import time
+import threading
+
+
+class Histogram:
+  """Counts of values in power-of-two buckets from 1 to 2**20 (1 us up to about 1 s for times)."""
+
+  BOUNDS = tuple(2 ** i for i in range(21))
+
+  def __init__(self, unit="us"):
+    self.unit = unit
+    self.counts = [0] * (len(self.BOUNDS) + 1)
+    self.count = 0
+    self.total = 0.0
+    self.max = 0.0
+
+  def add(self, value):
+    index = 0
+    bounds = self.BOUNDS
+    while index < len(bounds) and value > bounds[index]:
+      index += 1
+    self.counts[index] += 1
+    self.count += 1
+    self.total += value
+    if value > self.max:
+      self.max = value
+
+  def percentile(self, p):
+    if self.count == 0:
+      return 0.0
+    target = self.count * p / 100.0
+    seen = 0
+    for index, count in enumerate(self.counts):
+      seen += count
+      if seen >= target:
+        return float(self.BOUNDS[index]) if index < len(self.BOUNDS) else self.max
+    return self.max
+
+  def toDict(self):
+    unit = self.unit
+    return {
+      "count": self.count,
+      f"mean_{unit}": self.total / self.count if self.count else 0.0,
+      f"p50_{unit}": self.percentile(50),
+      f"p99_{unit}": self.percentile(99),
+      f"max_{unit}": self.max,
+      f"buckets_{unit}": {str(bound): count for bound, count in zip(self.BOUNDS + ("inf",), self.counts) if count},
+    }
+
+
+class ArrivalStats:
+  """Inter-arrival time of one packet stream: mean, jitter (standard deviation) and histogram."""
+
+  def __init__(self):
+    self.last_ns = 0
+    self.count = 0
+    self.mean = 0.0
+    self.m2 = 0.0
+    self.histogram = Histogram()
+
+  def add(self, now_ns):
+    if self.last_ns:
+      interval_us = (now_ns - self.last_ns) / 1000.0
+      self.count += 1
+      delta = interval_us - self.mean
+      self.mean += delta / self.count
+      self.m2 += delta * (interval_us - self.mean)
+      self.histogram.add(interval_us)
+    self.last_ns = now_ns
+
+  def toDict(self):
+    jitter = (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+    return {
+      "mean_us": self.mean,
+      "jitter_us": jitter,
+      "histogram": self.histogram.toDict(),
+    }
+
+
+class CmdStats:
+  """Receive path counters of one Cmd.
+
+  The framer counts bytes, checksum failures, resyncs and bytes discarded
+  while hunting for STX. This class adds packets per type and per sensor id,
+  inter-arrival jitter of sensor packets and the time the reader spends
+  framing and dispatching each chunk it read.
+  """
+
+  SENSOR_BYPASS_CMD = 0x000B
+  PKT_TYPE_STATUS = 0x07
+
+  def __init__(self, framer):
+    self.framer = framer
+    self.lock = threading.Lock()
+    self.reset()
+
+  def reset(self):
+    with self.lock:
+      self.framer.resetCounters()
+      self.start_ns = time.monotonic_ns()
+      self.prev_ns = self.start_ns
+      self.prev_bytes = 0
+      self.prev_packets = 0
+      self.packet_count = 0
+      self.type_count = {}
+      self.sensor_count = {}
+      self.sensor_arrival = {}
+      self.arrival = ArrivalStats()
+      self.chunk_size = Histogram("bytes")
+      self.loop_latency = Histogram("us")
+
+  def onChunk(self, length, elapsed_ns):
+    self.chunk_size.add(length)
+    self.loop_latency.add(elapsed_ns / 1000.0)
+
+  def onPacket(self, packet, now_ns):
+    self.packet_count += 1
+    self.type_count[packet.type] = self.type_count.get(packet.type, 0) + 1
+    if packet.type == self.PKT_TYPE_STATUS and packet.cmd == self.SENSOR_BYPASS_CMD and packet.length > 0:
+      sensor_id = packet.data[0]
+      self.sensor_count[sensor_id] = self.sensor_count.get(sensor_id, 0) + 1
+      arrival = self.sensor_arrival.get(sensor_id)
+      if arrival is None:
+        arrival = self.sensor_arrival[sensor_id] = ArrivalStats()
+      arrival.add(now_ns)
+      self.arrival.add(now_ns)
+
+  def snapshot(self):
+    """Current counters as a plain dict. Rates cover the time since the previous snapshot."""
+    with self.lock:
+      now_ns = time.monotonic_ns()
+      framer = self.framer
+      interval = (now_ns - self.prev_ns) / 1e9
+      bytes_per_sec = (framer.rx_bytes - self.prev_bytes) / interval if interval > 0 else 0.0
+      packets_per_sec = (self.packet_count - self.prev_packets) / interval if interval > 0 else 0.0
+      self.prev_ns = now_ns
+      self.prev_bytes = framer.rx_bytes
+      self.prev_packets = self.packet_count
+
+      return {
+        "elapsed_s": (now_ns - self.start_ns) / 1e9,
+        "rx_bytes": framer.rx_bytes,
+        "bytes_per_sec": bytes_per_sec,
+        "packets": self.packet_count,
+        "packets_per_sec": packets_per_sec,
+        "packets_by_type": {str(t): n for t, n in sorted(self.type_count.items())},
+        "packets_by_sensor": {str(i): n for i, n in sorted(self.sensor_count.items())},
+        "checksum_errors": framer.checksum_fail_count,
+        "length_errors": framer.length_fail_count,
+        "resyncs": framer.resync_count,
+        "discarded_bytes": framer.discard_bytes,
+        "sensor_arrival": self.arrival.toDict(),
+        "sensor_arrival_by_id": {str(i): a.toDict() for i, a in sorted(self.sensor_arrival.items())},
+        "chunk_bytes": self.chunk_size.toDict(),
+        "reader_latency": self.loop_latency.toDict(),
+      }
@@ -0,0 +1,133 @@
+import os
+import time
+import tempfile
+import argparse
+import threading
+
+import hday
+from hday.sim import TactileSimulator
+
+
+class CountingRobot(hday.Robot):
+    """Robot that counts the sensor bypass packets its user drained."""
+    received = 0
+
+    def drainSensorBypassPackets(self, timeout=0, with_timestamp=False):
+        packets = super().drainSensorBypassPackets(timeout, with_timestamp)
+        CountingRobot.received += len(packets)
+        return packets
+
+    def drainSensorBypassBatch(self, timeout=0):
+        batch = super().drainSensorBypassBatch(timeout)
+        CountingRobot.received += len(batch[0])
+        return batch
+
+    def getSensorBypassPacket(self, with_timestamp=False):
+        packet = super().getSensorBypassPacket(with_timestamp)
+        if packet[0] is not None:
+            CountingRobot.received += 1
+        return packet
+
+
+class CountingHub(hday.RobotHub):
+    def drainSensorBypassPackets(self, timeout=0):
+        packets = super().drainSensorBypassPackets(timeout)
+        CountingRobot.received += len(packets)
+        return packets
+
+    def drainSensorBypassBatch(self, timeout=0):
+        batch = super().drainSensorBypassBatch(timeout)
+        CountingRobot.received += len(batch[1])
+        return batch
+
+
+def run_robot(port, stop_event):
+    with CountingRobot(port) as robot:
+        robot.request_robot_enable(True)
+        while not stop_event.is_set():
+            robot.drainSensorBypassPackets(timeout=0.1)
+
+
+def run_hub(port, stop_event):
+    with CountingHub(port) as hub:
+        hub.enable(True)
+        while not stop_event.is_set():
+            hub.drainSensorBypassPackets(timeout=0.1)
+
+
+def run_recorder(port, stop_event):
+    import episode_manager.tactile_session as ts
+    from episode_manager.tactile_log import TactileStreamLog
+    ts.RobotHub = CountingHub
+    with tempfile.TemporaryDirectory() as episode_dir:
+        with ts.TactileSession(port) as session:
+            stream_log = TactileStreamLog(os.path.join(episode_dir, "tactile_stream.bin"), time.monotonic_ns(),
+                                          ports=session.hub.ports)
+            session.attach(stream_log)
+            stop_event.wait()
+            session.detach(stream_log)
+            stream_log.close()
+
+
+def run_live(port, stop_event):
+    import visualize
+    hday.Robot = CountingRobot
+    visualize.live_tactile_worker(port, stop_event)
+
+
+TARGETS = {
+    "robot": run_robot,
+    "hub": run_hub,
+    "recorder": run_recorder,
+    "live": run_live,
+}
+
+
+def measure(target, rate, duration, corrupt, garbage, devices=1):
+    CountingRobot.received = 0
+    stop_event = threading.Event()
+    sims = [TactileSimulator(rate, corrupt=corrupt, garbage=garbage) for _ in range(devices)]
+    for sim in sims:
+        sim.start()
+    # robot and live read a single port, hub and recorder read all of them
+    port = ",".join(sim.port for sim in sims)
+    consumer = threading.Thread(target=TARGETS[target], args=(port, stop_event), daemon=True)
+    consumer.start()
+    time.sleep(duration)
+    for sim in sims:
+        sim.setEnable(False)
+    time.sleep(0.5)  # let the consumer drain what is still in flight
+    sent = sum(sim.getSentCount() for sim in sims)
+    received = CountingRobot.received
+    stop_event.set()
+    consumer.join()
+    for sim in sims:
+        sim.stop()
+    return sent, received
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the highest tactile packet rate a consumer sustains.')
+    parser.add_argument('--target', type=str, default='robot', choices=sorted(TARGETS))
+    parser.add_argument('--rates', type=str, default='50,100,200,500,1000', help='Per-sensor rates in Hz')
+    parser.add_argument('--duration', type=float, default=3.0, help='Seconds of streaming per rate')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='Probability of a broken checksum per packet')
+    parser.add_argument('--garbage', type=float, default=0.0, help='Probability of random bytes before a packet')
+    parser.add_argument('--devices', type=int, default=1, help='Number of simulated controllers (hub and recorder)')
+    parser.add_argument('--max_loss', type=float, default=0.001, help='Loss ratio still counted as sustained')
+    args = parser.parse_args()
+
+    best_rate = None
+    for rate in [float(r) for r in args.rates.split(',')]:
+        devices = args.devices if args.target in ("hub", "recorder") else 1
+        sent, received = measure(args.target, rate, args.duration, args.corrupt, args.garbage, devices)
+        loss = 1.0 - received / sent if sent else 1.0
+        print(f"{args.target:>8} {rate:8.1f} Hz/sensor : sent {sent:7d}  received {received:7d}  loss {loss * 100:6.2f}%")
+        if loss <= args.max_loss:
+            best_rate = rate
+
+    print(f"highest sustained rate: {best_rate} Hz/sensor")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,3 @@
-import os
-import shutil
 from episode_manager import EpisodeManager
 import argparse
 
@@ -8,7 +6,13 @@ def main():
     parser.add_argument('--save_path', type=str, default='dataset/holiworld', help='Path to save the dataset')
     parser.add_argument('--start_sound_path', type=str, default='assets/sounds/start', help='Path to the start sound')
     parser.add_argument('--end_sound_path', type=str, default='assets/sounds/end', help='Path to the end sound')
-    parser.add_argument('--tactile_port', type=str, default='/dev/ttyACM0', help='Path to the tactile port')
+    parser.add_argument('--tactile_port', type=str, default='/dev/ttyACM0', help='Path to the tactile port, comma separated for several controllers')
+    parser.add_argument('--save_json', action='store_true', help='Also write tactile.json next to tactile.bin')
+    parser.add_argument('--encode_policy', type=str, default='block', choices=['block', 'drop_oldest', 'drop_newest'],
+                        help='What to do with a frame when the video encoder queue is full')
+    parser.add_argument('--baseline_samples', type=int, default=20, help='Samples per sensor averaged into its baseline')
+    parser.add_argument('--baseline_max_std', type=float, default=3.0,
+                        help='Largest standard deviation (x2 scaled values) of a sensor that counts as settled')
     args = parser.parse_args()
     
     SAVE_PATH = args.save_path
@@ -22,29 +26,35 @@ def main():
         END_SOUND_PATH, 
         tactile_port=TACTILE_PORT,
         fps=20.0, 
-        record_duration=3.0
+        record_duration=3.0,
+        save_json=args.save_json,
+        encode_policy=args.encode_policy,
+        baseline_samples=args.baseline_samples,
+        baseline_max_std=args.baseline_max_std
     )
     
     print(episode_manager.intro_message)
     
-    while True:
-        success, idx = episode_manager.run_episode()
-        if not success:
-            print("Episode recording failed. Exiting program.")
-            break
+    try:
+        while True:
+            success, idx = episode_manager.run_episode()
+            if not success:
+                print("Episode recording failed. Exiting program.")
+                break
         
-        user_choice = input("Press enter to save or type 'del' to delete: ").strip().lower()
-        episode_dir = os.path.join(SAVE_PATH, f"epi_{idx:06d}")
-        if user_choice == "del":
-            shutil.rmtree(episode_dir)
-            print(f"Episode {idx} has been deleted.")
-        else:
-            print(f"Episode {idx} has been saved.")
+            user_choice = input("Press enter to save or type 'del' to delete: ").strip().lower()
+            if user_choice == "del":
+                episode_manager.delete_episode(idx)
+                print(f"Episode {idx} has been deleted.")
+            else:
+                print(f"Episode {idx} has been saved.")
         
-        next_choice = input("Press enter to record the next episode or type 'exit' to quit: ").strip().lower()
-        if next_choice == "exit":
-            print("Exiting program.")
-            break
+            next_choice = input("Press enter to record the next episode or type 'exit' to quit: ").strip().lower()
+            if next_choice == "exit":
+                print("Exiting program.")
+                break
+    finally:
+        episode_manager.close()
 
 if __name__ == "__main__":
     main()
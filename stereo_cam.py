@@ -1,15 +1,8 @@
 import cv2
 import os
 
-def get_stereo_camera():
-    max_index = 3
-    for i in range(max_index):
-        cap = cv2.VideoCapture(i)
-        if cap.isOpened():
-            ret, frame = cap.read()
-            if ret and frame.shape[1] == 2560:
-                return cap
-    return None
+# 한 번 찾은 카메라는 sysfs 이름/serial로 캐시해서 다음에는 바로 열림
+from episode_manager.camera import get_stereo_camera
 
 def main():
     # 저장할 디렉토리 생성 (없으면 생성)
@@ -3,15 +3,19 @@ import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
 import threading
-import time
 
 # =============================================================================
 # 기존 파일 기반 시각화 코드
 # =============================================================================
 
 def load_tactile_data(filepath):
-    with open(filepath, 'r') as f:
-        data = json.load(f)
+    # tactile.bin(바이너리)과 기존 tactile.json 모두 같은 프레임 리스트로 읽음
+    if filepath.endswith(".bin"):
+        from episode_manager.tactile_file import TactileFile
+        data = TactileFile(filepath).to_json_list()
+    else:
+        with open(filepath, 'r') as f:
+            data = json.load(f)
     # 촉각 데이터가 있는 프레임만 필터링
     frames = [d for d in data if d.get("tactile") and d["tactile"]]
     return frames
@@ -140,30 +144,25 @@ def animate_tactile_video(frames):
 # =============================================================================
 
 # 전역 변수 (실시간 센서 데이터 저장용)
-live_tactile_lock = threading.Lock()
-live_tactile_data = {}
+live_tactile_state = None
 
 def live_tactile_worker(tactile_port="/dev/ttyACM0", stop_event=None):
     """
-    실시간 촉각 센서 데이터를 읽어 전역 딕셔너리 live_tactile_data에 업데이트합니다.
+    실시간 촉각 센서 데이터를 읽어 전역 live_tactile_state(hday.TactileState)에 업데이트합니다.
     hday.Robot 클래스를 사용합니다.
     """
-    from hday import Robot  # hday 모듈이 환경에 있어야 합니다.
+    global live_tactile_state
+    from hday import Robot, TactileState  # hday 모듈이 환경에 있어야 합니다.
+    if live_tactile_state is None:
+        live_tactile_state = TactileState()
     try:
         with Robot(tactile_port) as robot:
             robot.request_robot_enable(True)
             while not stop_event.is_set():
-                sensor_id, sensor_data = robot.getSensorBypassPacket()
-                # 센서 id가 128~139인 경우만 처리
-                if sensor_id is not None and 128 <= sensor_id <= 139:
-                    tactile_timestamp = time.perf_counter()
-                    with live_tactile_lock:
-                        # key를 문자열로 통일
-                        live_tactile_data[str(sensor_id)] = {
-                            "data": sensor_data,
-                            "timestamp": tactile_timestamp
-                        }
-                time.sleep(0.001)
+                # 센서 id가 128~139인 패킷만 반영됨
+                ids, rx_ns, values = robot.drainSensorBypassBatch(timeout=0.1)
+                if len(ids):
+                    live_tactile_state.update(ids, rx_ns, values)
     except Exception as e:
         print("Live tactile worker error:", e)
 
@@ -175,8 +174,13 @@ def animate_live(frame_idx, ax_right, ax_left, right_sensor_ids, right_positions
     init_hand(ax_left, (-50, 0), (0, 30))
 
     # 전역 변수에서 최신 촉각 데이터를 읽어옴
-    with live_tactile_lock:
-        tactile_snapshot = live_tactile_data.copy()
+    tactile_snapshot = {}
+    if live_tactile_state is not None:
+        values, rx_ns = live_tactile_state.snapshot()
+        for row, sensor_id in enumerate(live_tactile_state.sensor_ids.tolist()):
+            if rx_ns[row]:
+                # key를 문자열로 통일
+                tactile_snapshot[str(sensor_id)] = {"data": values[row], "timestamp": rx_ns[row] / 1e9}
 
     draw_hand(ax_right, tactile_snapshot, right_sensor_ids, right_positions, right_sensor_labels)
     ax_right.set_title("Right Hand (Live)")